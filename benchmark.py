@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add the current directory to path to import config
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark mengukur database, bukan snapshot di disk: tanpa ini muatan pertama setiap loader
+# dilayani dari .snapshots/ (bisa berasal dari seed skala lain) dan tercatat sebagai waktu cold
+os.environ["SNAPSHOT_ENABLED"] = "0"
+
+import pandas as pd
+
+import config
+from config import get_cursor, invalidate_cache
+from snapshot import SnapshotStore
+from maintenance import (MATERIALIZED_VIEWS, create_indexes, create_materialized_views, create_rollup_tables,
+                         rebuild_sales_rollup, refresh_materialized_views)
+
+# Copy-on-Write seperti di main.py, agar filter dan join frame bersama diukur dengan perilaku yang sama
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# ============================
+# Benchmark skala data dashboard
+# ============================
+# PERINGATAN: perintah "seed" mengosongkan tabel customers, products, orders, dan order_details.
+# Jalankan hanya terhadap database lokal khusus benchmark (atur lewat DB_NAME dll. di environment).
+
+# Nama skala -> jumlah baris order_details
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Rata-rata jumlah baris detail per pesanan dan pesanan per pelanggan pada data sintetis
+LINES_PER_ORDER = 4
+ORDERS_PER_CUSTOMER = 6
+
+def _with_fetch_mode(mode, func):
+    """Jalankan func dengan DETAIL_FETCH_MODE tertentu, lalu kembalikan mode semula."""
+    previous, config.DETAIL_FETCH_MODE = config.DETAIL_FETCH_MODE, mode
+    try:
+        return func()
+    finally:
+        config.DETAIL_FETCH_MODE = previous
+
+# Fungsi data layer yang diukur: nama -> fungsi tanpa argumen
+BENCHMARK_FUNCTIONS = {
+    "view_summary": config.view_summary,
+    "view_customers": config.view_customers,
+    "view_customers_page": config.view_customers_page,
+    "view_customers_bounds": config.view_customers_bounds,
+    "view_products": config.view_products,
+    "view_orders_with_customers": config.view_orders_with_customers,
+    "view_orders_bounds": config.view_orders_bounds,
+    "view_order_details_with_info[star]": lambda: _with_fetch_mode("star", config.view_order_details_with_info),
+    "view_order_details_with_info[join]": lambda: _with_fetch_mode("join", config.view_order_details_with_info),
+    "view_order_details_bounds": config.view_order_details_bounds,
+    "view_product_names": config.view_product_names,
+    "view_top_n[products]": lambda: config.view_top_n("products"),
+    "view_top_n[order_details]": lambda: config.view_top_n("order_details"),
+    "view_top_n[sales_rollup]": lambda: config.view_top_n("sales_rollup"),
+    "view_sales_rollup[product]": lambda: config.view_sales_rollup("product"),
+    "view_sales_rollup[day]": lambda: config.view_sales_rollup("day"),
+}
+for _view_name in MATERIALIZED_VIEWS:
+    BENCHMARK_FUNCTIONS[f"view_rollup[{_view_name}]"] = (lambda name=_view_name: config.view_rollup(name))
+
+# Fungsi halaman di main.py -> label halaman di sidebar
+BENCHMARK_PAGES = {
+    "tabelCustomers_dan_export": "👥 Pelanggan",
+    "visualisasiProducts": "📦 Produk",
+    "visualisasiOrders": "🛒 Pesanan",
+    "visualisasiOrderDetails": "📋 Detail Pesanan",
+}
+
+def parse_scale(value):
+    """Terima nama skala (mis. "1m") atau jumlah baris order_details secara langsung."""
+    value = value.lower().replace("_", "")
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+def seed_database(order_lines, seed=0.42):
+    """Isi ulang database dengan data sintetis sebanyak order_lines baris order_details.
+
+    Data dibuat di sisi server dengan generate_series sehingga skala 10 juta baris tetap cepat,
+    dan deterministik untuk seed yang sama agar hasil benchmark bisa dibandingkan.
+    """
+    orders = max(1, order_lines // LINES_PER_ORDER)
+    customers = max(1, orders // ORDERS_PER_CUSTOMER)
+    products = min(5000, max(40, order_lines // 1000))
+    started = time.perf_counter()
+
+    with get_cursor(commit=True) as cur:
+        cur.execute("SELECT setseed(%s)", (seed,))
+        cur.execute("TRUNCATE order_details, orders, products, customers RESTART IDENTITY")
+        cur.execute('''
+            INSERT INTO customers (name, email, phone, address, birthdate)
+            SELECT
+                'Pelanggan ' || lpad(i::text, 8, '0'),
+                'pelanggan' || i || '@example.com',
+                '08' || lpad((random() * 1e10)::bigint::text, 10, '0'),
+                'Jl. Contoh No. ' || (i %% 200 + 1),
+                date '1950-01-01' + (random() * 20000)::int
+            FROM generate_series(1, %s) AS i
+        ''', (customers,))
+        cur.execute('''
+            INSERT INTO products (name, description, price, stock)
+            SELECT
+                'Produk ' || lpad(i::text, 4, '0'),
+                'Produk sintetis nomor ' || i,
+                (5 + (random() * 95)::int) * 5000,
+                (random() * 100)::int
+            FROM generate_series(1, %s) AS i
+        ''', (products,))
+        cur.execute('''
+            INSERT INTO orders (customer_id, order_date, total_amount)
+            SELECT
+                1 + (random() * (%s - 1))::int,
+                current_date - (random() * 730)::int,
+                0
+            FROM generate_series(1, %s) AS i
+        ''', (customers, orders))
+        cur.execute('''
+            INSERT INTO order_details (order_id, product_id, quantity, subtotal)
+            SELECT g.order_id, p.product_id, g.quantity, g.quantity * p.price
+            FROM (
+                SELECT
+                    1 + (i - 1) %% %s AS order_id,
+                    1 + (random() * (%s - 1))::int AS product_id,
+                    1 + (random() * 6)::int AS quantity
+                FROM generate_series(1, %s) AS i
+            ) g
+            JOIN products p ON p.product_id = g.product_id
+        ''', (orders, products, order_lines))
+        cur.execute('''
+            UPDATE orders o SET total_amount = s.total
+            FROM (SELECT order_id, SUM(subtotal) AS total FROM order_details GROUP BY order_id) s
+            WHERE o.order_id = s.order_id
+        ''')
+
+    with get_cursor(commit=True) as cur:
+        cur.execute("ANALYZE customers, products, orders, order_details")
+    create_indexes()
+    create_rollup_tables()
+    rebuild_sales_rollup()
+    create_materialized_views()
+    refresh_materialized_views(concurrently=False)
+    invalidate_cache()
+    # Snapshot dashboard berisi data sebelum seed; hapus agar tidak dilayani saat cold start
+    SnapshotStore(config.SNAPSHOT_DIR).clear()
+
+    print(f"✅ Seed selesai dalam {time.perf_counter() - started:.2f} detik: "
+          f"{customers} pelanggan, {products} produk, {orders} pesanan, {order_lines} detail pesanan")
+
+def table_counts():
+    """Jumlah baris tiap tabel, dicatat di laporan sebagai konteks hasil benchmark."""
+    with get_cursor() as cur:
+        cur.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM customers),
+                (SELECT COUNT(*) FROM products),
+                (SELECT COUNT(*) FROM orders),
+                (SELECT COUNT(*) FROM order_details)
+        ''')
+        row = cur.fetchone()
+    return dict(zip(["customers", "products", "orders", "order_details"], row))
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        return 1
+    return len(result)
+
+def measure(func):
+    """Jalankan func sekali dan kembalikan (hasil, detik, puncak memori dalam MB)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+def benchmark_functions():
+    """Ukur setiap fungsi data layer dalam keadaan cache kosong (cold) dan dari cache (warm)."""
+    results = []
+    for name, func in BENCHMARK_FUNCTIONS.items():
+        invalidate_cache()
+        result, seconds, peak_mb = measure(func)
+        _, cached_seconds, _ = measure(func)
+        results.append({
+            "name": name,
+            "rows": _row_count(result),
+            "seconds": round(seconds, 4),
+            "cached_seconds": round(cached_seconds, 4),
+            "peak_mb": round(peak_mb, 2),
+        })
+        print(f"⏱️ {name}: {results[-1]['rows']} baris, {seconds:.3f} detik, {peak_mb:.1f} MB")
+    return results
+
+def benchmark_pages(timeout=600):
+    """Render setiap halaman main.py secara headless dengan Streamlit AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    results = []
+    for name, page in BENCHMARK_PAGES.items():
+        runs = []
+        invalidate_cache()
+        for _ in range(2):  # run pertama cold, run kedua memakai cache
+            app = AppTest.from_file(script, default_timeout=timeout)
+            app.session_state.active_page = page
+            runs.append(measure(app.run) + (app,))
+        _, seconds, peak_mb, app = runs[0]
+        errors = [str(e.value) for e in app.error] + [str(e.value) for e in app.exception]
+        results.append({
+            "name": name,
+            "page": page,
+            "seconds": round(seconds, 4),
+            "cached_seconds": round(runs[1][1], 4),
+            "peak_mb": round(peak_mb, 2),
+            "errors": errors,
+        })
+        status = f"{len(errors)} error" if errors else "OK"
+        print(f"⏱️ {name}: {seconds:.3f} detik, {peak_mb:.1f} MB ({status})")
+    return results
+
+# Groupby yang dijalankan halaman Detail Pesanan pada frame order_details
+DTYPE_GROUPBYS = {
+    "produk_terlaris": lambda df: df.groupby("product_name", observed=True).agg(
+        quantity=("quantity", "sum"), subtotal=("subtotal", "sum"), jumlah_pesanan=("order_id", "count")
+    ),
+    "produk_unik": lambda df: df["product_name"].nunique(),
+    "per_pelanggan": lambda df: df.groupby("customer_name", observed=True)["subtotal"].sum(),
+}
+
+def _best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def benchmark_dtypes():
+    """Bandingkan kolom teks berulang order_details sebagai category dan sebagai object (str Python).
+
+    Mengukur memori frame (deep) dan waktu groupby yang dipakai halaman Detail Pesanan.
+    """
+    invalidate_cache()
+    text_columns = ["customer_name", "product_name", "phone"]
+    categorical = config.join_dimensions(config.view_order_details_with_info(), text_columns)
+    variants = {
+        "category": categorical,
+        "object": categorical.astype({col: object for col in text_columns}),
+    }
+    results = {"columns": text_columns, "rows": len(categorical)}
+    for name, df in variants.items():
+        results[name] = {
+            "memory_mb": round(df.memory_usage(index=True, deep=True).sum() / (1024 * 1024), 2),
+            "groupby_seconds": {label: round(_best_of(lambda: group(df)), 5) for label, group in DTYPE_GROUPBYS.items()},
+        }
+    print(f"⏱️ dtype order_details: category {results['category']['memory_mb']} MB, "
+          f"object {results['object']['memory_mb']} MB")
+    for label in DTYPE_GROUPBYS:
+        print(f"   {label}: category {results['category']['groupby_seconds'][label]:.4f} detik, "
+              f"object {results['object']['groupby_seconds'][label]:.4f} detik")
+    return results
+
+def benchmark_prepared(repeat=20):
+    """Bandingkan query loader berfilter sempit tanpa dan dengan prepared statement.
+
+    Setiap query dijalankan berulang lewat config._fetch_rows (tanpa cache), sehingga biaya parse/plan
+    ikut terukur; query kecil paling diuntungkan karena planning time mendominasi waktu eksekusinya.
+    """
+    with get_cursor() as cur:
+        cur.execute("SELECT MIN(order_date)::date FROM orders")
+        first_day = cur.fetchone()[0]
+    queries = {
+        "orders": config._orders_query(date_from=first_day, date_to=first_day),
+        "order_details": config._order_details_query(date_from=first_day, date_to=first_day),
+        "customers": config._customers_query(min_age=30, max_age=40),
+        "products": config._products_query(min_price=100_000),
+    }
+    previous = config.PREPARED_STATEMENTS
+    results = {}
+    try:
+        for name, (query, params) in queries.items():
+            run = lambda: config._fetch_rows(query, params, label=name)
+            timings = {}
+            for label, enabled in (("plain", False), ("prepared", True)):
+                config.PREPARED_STATEMENTS = enabled
+                run()  # pemanasan: koneksi pool dan PREPARE tidak ikut diukur
+                timings[label] = _best_of(lambda: [run() for _ in range(repeat)], repeat=3) / repeat
+            results[name] = {label: round(seconds * 1000, 3) for label, seconds in timings.items()}
+            print(f"⏱️ prepared {name}: biasa {results[name]['plain']:.3f} ms, "
+                  f"prepared {results[name]['prepared']:.3f} ms per query")
+    finally:
+        config.PREPARED_STATEMENTS = previous
+    return {"ms_per_query": results, "stats": config.prepared_statement_stats()}
+
+def run_benchmark(output=None, pages=True):
+    """Jalankan semua pengukuran terhadap isi database saat ini dan tulis laporan JSON."""
+    counts = table_counts()
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "database": config.db_type,
+        "counts": counts,
+        "functions": benchmark_functions(),
+        "dtypes": benchmark_dtypes(),
+        "prepared": benchmark_prepared(),
+        "pages": benchmark_pages() if pages else [],
+    }
+    output = output or f"benchmark_{counts['order_details']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Laporan benchmark ditulis ke {output}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard sales pada berbagai skala data")
+    parser.add_argument("command", choices=["seed", "run", "all"],
+                        help="seed: isi data sintetis, run: ukur data saat ini, all: seed lalu ukur")
+    parser.add_argument("--scale", default="10k",
+                        help=f"Jumlah baris order_details: {', '.join(SCALES)} atau angka")
+    parser.add_argument("--output", help="Path laporan JSON (default: benchmark_<jumlah baris>.json)")
+    parser.add_argument("--no-pages", action="store_true", help="Lewati benchmark halaman main.py")
+    parser.add_argument("--yes", action="store_true",
+                        help="Konfirmasi bahwa isi tabel boleh dihapus saat seed")
+    args = parser.parse_args()
+
+    if args.command in ("seed", "all"):
+        if not args.yes:
+            parser.error("seed mengosongkan semua tabel; tambahkan --yes untuk melanjutkan")
+        seed_database(parse_scale(args.scale))
+    if args.command in ("run", "all"):
+        run_benchmark(args.output, pages=not args.no_pages)
@@ -0,0 +1,184 @@
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# ============================
+# Cache data in-process untuk hasil query dashboard
+# ============================
+
+def estimate_size(value):
+    """Perkiraan ukuran nilai cache dalam byte.
+
+    DataFrame diukur dengan memory_usage(deep=True) (termasuk isi kolom teks); hasil fetchall/fetchone
+    diperkirakan dari ukuran list, tuple baris, dan nilai-nilainya.
+    """
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class DataCache:
+    """Cache hasil query dengan TTL per dataset, batas jumlah entri dan ukuran total (LRU), dan penghitung hit/miss.
+
+    Satu instance dipakai bersama oleh semua session Streamlit di proses yang sama.
+    Entri disimpan dengan kunci (dataset, key) sehingga bisa di-invalidate per dataset.
+    Entri kedaluwarsa tetap disimpan (sampai tergeser LRU) agar bisa diperbarui secara incremental.
+    Setiap nilai baru mendapat nomor versi yang naik terus; menyimpan ulang objek yang sama
+    (refresh incremental tanpa baris baru) tidak mengubah versinya.
+    Kunci yang di-pin (frame bersama) tidak ikut batas jumlah/ukuran dan tidak pernah dibuang LRU,
+    sehingga entri kedaluwarsanya selalu tersedia untuk refresh incremental.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (dataset, key) -> (expires_at, value, loaded_at, version, size)
+        self._pinned = set()  # (dataset, key) yang tidak dibuang LRU
+        self._bytes = 0  # Total ukuran entri yang tidak di-pin
+        self._versions = itertools.count(1)
+        self._loading = {}  # (dataset, key) -> Lock, mencegah query ganda untuk kunci yang sama
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, dataset, field):
+        stats = self._stats.setdefault(dataset, {"hits": 0, "misses": 0, "refreshes": 0, "evictions": 0})
+        stats[field] += 1
+
+    def _remove(self, full_key):
+        """Hapus satu entri dan kurangi total ukurannya. Harus dipanggil saat memegang _lock."""
+        entry = self._entries.pop(full_key, None)
+        if entry is not None and full_key not in self._pinned:
+            self._bytes -= entry[4]
+        return entry
+
+    def _evict(self, keep):
+        """Buang entri tidak di-pin yang paling lama tidak dipakai sampai batas terpenuhi, kecuali kunci keep.
+
+        Harus dipanggil saat memegang _lock.
+        """
+        unpinned = sum(1 for full_key in self._entries if full_key not in self._pinned)
+        for full_key in list(self._entries):
+            if unpinned <= self.max_entries and (self.max_bytes is None or self._bytes <= self.max_bytes):
+                break
+            if full_key in self._pinned or full_key == keep:
+                continue
+            self._remove(full_key)
+            unpinned -= 1
+            self._count(full_key[0], "evictions")
+
+    def pin(self, dataset, key):
+        """Kecualikan kunci dari batas jumlah/ukuran dan dari LRU; entri tetap bisa di-invalidate."""
+        full_key = (dataset, key)
+        with self._lock:
+            if full_key in self._pinned:
+                return
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                self._bytes -= entry[4]
+            self._pinned.add(full_key)
+
+    def _lookup(self, full_key):
+        """Kembalikan (True, value) jika entri masih segar. Harus dipanggil saat memegang _lock."""
+        entry = self._entries.get(full_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(full_key)
+            self._count(full_key[0], "hits")
+            return True, entry[1]
+        return False, None
+
+    def get_or_load(self, dataset, key, loader, ttl, refresh=None, full_reload_after=None):
+        """Ambil nilai dari cache, atau jalankan loader() lalu simpan hasilnya selama ttl detik.
+
+        Jika refresh diberikan dan entri lama masih ada, entri yang kedaluwarsa diperbarui dengan
+        refresh(nilai_lama) alih-alih loader(), sampai umur muatan penuh melewati full_reload_after detik.
+        Exception dari loader/refresh diteruskan ke pemanggil dan tidak disimpan di cache.
+        """
+        full_key = (dataset, key)
+        with self._lock:
+            found, value = self._lookup(full_key)
+            if found:
+                return value
+            load_lock = self._loading.setdefault(full_key, threading.Lock())
+
+        with load_lock:
+            # Thread lain mungkin sudah memuat kunci yang sama selama kita menunggu
+            with self._lock:
+                found, value = self._lookup(full_key)
+                if found:
+                    return value
+                stale = self._entries.get(full_key)
+                incremental = (
+                    refresh is not None and stale is not None
+                    and (full_reload_after is None or time.monotonic() - stale[2] < full_reload_after)
+                )
+                self._count(dataset, "refreshes" if incremental else "misses")
+            try:
+                if incremental:
+                    value, loaded_at = refresh(stale[1]), stale[2]
+                else:
+                    value, loaded_at = loader(), time.monotonic()
+                # Simpan dulu sebelum lock muatan dilepas, agar thread yang datang di antaranya
+                # menemukan nilai ini dan tidak menjalankan query yang sama lagi
+                self.put(dataset, key, value, ttl, loaded_at=loaded_at)
+            finally:
+                with self._lock:
+                    self._loading.pop(full_key, None)
+            return value
+
+    def put(self, dataset, key, value, ttl, loaded_at=None):
+        """Simpan nilai ke cache dan buang entri paling lama tidak dipakai jika melebihi batas.
+
+        Entri yang baru disimpan tidak pernah dibuang, meski ukurannya sendiri melebihi max_bytes.
+        """
+        full_key = (dataset, key)
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(full_key)
+            same = current is not None and current[1] is value
+        # Ukur di luar lock: memory_usage(deep=True) pada frame besar butuh waktu
+        size = current[4] if same else estimate_size(value)
+        with self._lock:
+            current = self._remove(full_key)
+            version = current[3] if current is not None and current[1] is value else next(self._versions)
+            self._entries[full_key] = (now + ttl, value, now if loaded_at is None else loaded_at, version, size)
+            if full_key not in self._pinned:
+                self._bytes += size
+            self._evict(keep=full_key)
+
+    def entry(self, dataset, key):
+        """Kembalikan (version, value) entri apa adanya (termasuk yang kedaluwarsa), atau (None, None).
+
+        Tidak dihitung sebagai hit dan tidak mengubah urutan LRU; dipakai untuk statistik.
+        """
+        with self._lock:
+            entry = self._entries.get((dataset, key))
+        return (None, None) if entry is None else (entry[3], entry[1])
+
+    def invalidate(self, dataset=None, key=None):
+        """Hapus semua entri, hanya entri milik satu dataset, atau satu entri (dataset, key)."""
+        with self._lock:
+            if dataset is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            full_keys = [(dataset, key)] if key is not None else [k for k in self._entries if k[0] == dataset]
+            for full_key in full_keys:
+                self._remove(full_key)
+
+    def stats(self):
+        """Statistik per dataset: hits, misses, refreshes, evictions, serta jumlah entri dan ukurannya (byte) saat ini.
+
+        bytes hanya entri yang ikut batas ukuran; entri yang di-pin dihitung terpisah di pinned_bytes.
+        """
+        with self._lock:
+            result = {dataset: dict(stats, entries=0, bytes=0, pinned_bytes=0) for dataset, stats in self._stats.items()}
+            for full_key, entry in self._entries.items():
+                stats = result.setdefault(full_key[0], {
+                    "hits": 0, "misses": 0, "refreshes": 0, "evictions": 0, "entries": 0, "bytes": 0, "pinned_bytes": 0
+                })
+                stats["entries"] += 1
+                stats["pinned_bytes" if full_key in self._pinned else "bytes"] += entry[4]
+            return result
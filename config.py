@@ -1,171 +1,1745 @@
 import psycopg2
-from psycopg2 import OperationalError, DatabaseError
+from psycopg2 import OperationalError, DatabaseError, InterfaceError
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from psycopg2.extensions import QueryCanceledError
+from psycopg2.errors import DuplicatePreparedStatement, InvalidSqlStatementName
+from psycopg2 import sql
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait
+import contextvars
+import hashlib
+import itertools
+import json
+import operator
+import re
+import threading
+import time
+import tempfile
+import gzip
 import sys
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
+from cache import DataCache
+from snapshot import SnapshotStore
+import perf
 
 # Load environment variables from .env
 load_dotenv()
 
 # ============================
-# Koneksi ke database PostgreSQL / Supabase
+# Koneksi ke database PostgreSQL / Supabase (connection pool)
 # ============================
-conn = None
-c = None
+pool = None
 
 # Determine if using Supabase or local PostgreSQL
 USE_SUPABASE = os.getenv("DB_HOST", "").endswith("supabase.co")
 
-try:
+# Ukuran pool koneksi (bisa diatur lewat .env)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Lama menunggu koneksi kosong dari pool sebelum menyerah (detik)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Jeda sebelum mencoba koneksi ulang setelah gagal terhubung (detik)
+DB_RETRY_INTERVAL = float(os.getenv("DB_RETRY_INTERVAL", "30"))
+# Batas waktu membuka koneksi baru ke database (detik), agar host yang tidak bisa dihubungi tidak menggantung
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+# Semaphore membatasi jumlah koneksi yang dipinjam sekaligus, sehingga
+# session yang kelebihan akan menunggu alih-alih mendapat PoolError
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+# Pool dibuat secara lazy oleh get_pool(), bukan saat config.py di-import
+db_type = "Supabase" if USE_SUPABASE else "PostgreSQL Local"
+db_version = ("Belum terhubung",)
+_pool_init_lock = threading.Lock()
+_last_connect_attempt = float("-inf")
+
+def _connection_params():
+    params = dict(
+        host=os.getenv("DB_HOST", "db.hbdiwdfzryzvbexbehyr.supabase.co"),
+        port=os.getenv("DB_PORT", "5432"),
+        user=os.getenv("DB_USER", "DeathMoonerg"),
+        password=os.getenv("DB_PASSWORD", "5AY2ZV2zJXVNDJJZ"),
+        dbname=os.getenv("DB_NAME", "sales_db"),
+        connect_timeout=DB_CONNECT_TIMEOUT,
+    )
     if USE_SUPABASE:
-        # Connection to Supabase
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST", "db.hbdiwdfzryzvbexbehyr.supabase.co"),
-            port=os.getenv("DB_PORT", "5432"),
-            user=os.getenv("DB_USER", "DeathMoonerg"),
-            password=os.getenv("DB_PASSWORD", "5AY2ZV2zJXVNDJJZ"),
-            dbname=os.getenv("DB_NAME", "sales_db"),
-            sslmode="require"
-        )
-        db_type = "Supabase"
-    else:
-        # Connection to local PostgreSQL
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST", "db.hbdiwdfzryzvbexbehyr.supabase.co"),
-            port=os.getenv("DB_PORT", "5432"),
-            user=os.getenv("DB_USER", "DeathMoonerg"),
-            password=os.getenv("DB_PASSWORD", "5AY2ZV2zJXVNDJJZ"),
-            dbname=os.getenv("DB_NAME", "sales_db")
-        )
-        db_type = "PostgreSQL Local"
+        params["sslmode"] = "require"
+    return params
 
-    # Membuat cursor
-    c = conn.cursor()
-    
-    # Test koneksi dengan query sederhana
-    c.execute("SELECT version();")
-    db_version = c.fetchone()
-    
-    print("✅ Koneksi database berhasil!")
-    print(f"📊 Database Type: {db_type}")
-    print(f"🔗 Database Version: {db_version[0]}")
+def _init_pool():
+    """Buat connection pool dan uji koneksi. Mengembalikan pool, atau None jika gagal (mode offline)."""
+    global pool, db_version
+    try:
+        # Connection pool thread-safe: setiap query meminjam koneksi sendiri
+        new_pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, connection_factory=_Connection,
+                                          **_connection_params())
+
+        # Test koneksi dengan query sederhana
+        _conn = new_pool.getconn()
+        try:
+            with _conn.cursor() as _cur:
+                _cur.execute("SELECT version();")
+                db_version = _cur.fetchone()
+            _conn.rollback()
+        finally:
+            new_pool.putconn(_conn)
+
+        print("✅ Koneksi database berhasil!")
+        print(f"📊 Database Type: {db_type}")
+        print(f"🔗 Database Version: {db_version[0]}")
+        print(f"🧵 Connection Pool: min={DB_POOL_MIN}, max={DB_POOL_MAX}")
+        pool = new_pool
+        return pool
     
-except OperationalError as e:
-    print("⚠️  WARNING: Gagal terhubung ke database!")
-    print(f"   Detail Error: {str(e)}")
-    print("\n💡 Tips untuk memperbaiki:")
-    if USE_SUPABASE:
-        print("   1. Periksa konfigurasi Supabase di .env file")
-        print("   2. Pastikan DB_HOST, DB_USER, DB_PASSWORD, dan DB_NAME sudah benar")
-        print("   3. Pastikan Supabase project sudah aktif")
-    else:
-        print("   1. Pastikan PostgreSQL sudah berjalan")
-        print("   2. Periksa host, port, user, password, dan dbname di .env atau config.py")
-        print("   3. Pastikan database sudah dibuat")
-    print("\n   Aplikasi akan dimulai dalam mode offline. Data tidak akan tersedia.\n")
-    db_version = ("Offline Mode",)
+    except OperationalError as e:
+        print("⚠️  WARNING: Gagal terhubung ke database!")
+        print(f"   Detail Error: {str(e)}")
+        print("\n💡 Tips untuk memperbaiki:")
+        if USE_SUPABASE:
+            print("   1. Periksa konfigurasi Supabase di .env file")
+            print("   2. Pastikan DB_HOST, DB_USER, DB_PASSWORD, dan DB_NAME sudah benar")
+            print("   3. Pastikan Supabase project sudah aktif")
+        else:
+            print("   1. Pastikan PostgreSQL sudah berjalan")
+            print("   2. Periksa host, port, user, password, dan dbname di .env atau config.py")
+            print("   3. Pastikan database sudah dibuat")
+        print("\n   Aplikasi akan dimulai dalam mode offline. Data dari snapshot terakhir ditampilkan jika ada.\n")
+        db_version = ("Offline Mode",)
     
-except DatabaseError as e:
-    print("⚠️  WARNING: Terjadi kesalahan pada database!")
-    print(f"   Detail Error: {str(e)}")
-    print("\n   Aplikasi akan dimulai dalam mode offline. Data tidak akan tersedia.\n")
-    db_version = ("Offline Mode",)
+    except DatabaseError as e:
+        print("⚠️  WARNING: Terjadi kesalahan pada database!")
+        print(f"   Detail Error: {str(e)}")
+        print("\n   Aplikasi akan dimulai dalam mode offline. Data dari snapshot terakhir ditampilkan jika ada.\n")
+        db_version = ("Offline Mode",)
     
-except Exception as e:
-    print("⚠️  WARNING: Terjadi kesalahan tidak terduga!")
-    print(f"   Detail Error: {str(e)}")
-    print("\n   Aplikasi akan dimulai dalam mode offline. Data tidak akan tersedia.\n")
-    db_version = ("Offline Mode",)
+    except Exception as e:
+        print("⚠️  WARNING: Terjadi kesalahan tidak terduga!")
+        print(f"   Detail Error: {str(e)}")
+        print("\n   Aplikasi akan dimulai dalam mode offline. Data dari snapshot terakhir ditampilkan jika ada.\n")
+        db_version = ("Offline Mode",)
+    return None
+
+def get_pool():
+    """Ambil connection pool, dibuat saat pertama kali dibutuhkan (bukan saat import).
+
+    Jika koneksi gagal, aplikasi berjalan dalam mode offline dan koneksi dicoba
+    lagi paling cepat setelah DB_RETRY_INTERVAL detik.
+    """
+    global _last_connect_attempt
+    if pool is not None:
+        return pool
+    with _pool_init_lock:
+        if pool is None and time.monotonic() - _last_connect_attempt >= DB_RETRY_INTERVAL:
+            _last_connect_attempt = time.monotonic()
+            _init_pool()
+    return pool
+
+@contextmanager
+def _borrow(db_pool, slots, commit=False):
+    """Pinjam satu koneksi dari db_pool (dibatasi semaphore slots) dan berikan cursor miliknya sendiri."""
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise PoolError(f"Tidak ada koneksi kosong di pool setelah {DB_POOL_TIMEOUT} detik")
+    conn = None
+    try:
+        conn = db_pool.getconn()
+        with conn.cursor() as cur:
+            yield cur
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()  # Query hanya SELECT, akhiri transaksi agar koneksi bersih
+    except Exception:
+        if conn is not None and not conn.closed:
+            try:
+                conn.rollback()
+            except (OperationalError, InterfaceError):
+                pass
+        raise
+    finally:
+        if conn is not None:
+            # Koneksi yang putus dibuang dari pool, bukan dipakai ulang
+            db_pool.putconn(conn, close=bool(conn.closed))
+        slots.release()
+
+@contextmanager
+def get_cursor(commit=False):
+    """Pinjam satu koneksi dari pool primary dan berikan cursor miliknya sendiri.
+
+    Koneksi dikembalikan ke pool setelah blok selesai, termasuk saat terjadi error.
+    commit=True menyimpan perubahan (untuk DDL/maintenance); default transaksi di-rollback.
+    Query baca dashboard sebaiknya lewat run_read() agar bisa diarahkan ke read replica.
+    """
+    db_pool = get_pool()
+    if db_pool is None:
+        raise OperationalError("Database tidak terhubung (mode offline)")
+    with _borrow(db_pool, _pool_slots, commit) as cur:
+        yield cur
+
+# ============================
+# Read replica: query baca dashboard diarahkan ke replica, primary sebagai cadangan
+# ============================
+# DSN replica dipisah ";" (format libpq "host=... port=..." atau URI postgresql://...).
+# Parameter yang tidak disebut (user, password, dbname) mengikuti koneksi primary.
+# Kosong = semua query ke primary.
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(";") if dsn.strip()]
+# Replica yang tertinggal lebih dari ini (detik) tidak dipakai sampai menyusul
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30"))
+# Jeda antar pemeriksaan kesehatan dan lag setiap replica (detik)
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "15"))
+# Batas waktu membuka koneksi ke replica (detik), agar host yang tidak bisa dihubungi tidak menahan query
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "5"))
+
+# Lag replikasi dalam detik. Replica dianggap tanpa lag jika sudah memutar ulang WAL sampai posisi
+# primary saat pemeriksaan (parameter, NULL jika pool primary belum dibuka), atau jika WAL receiver-nya
+# sedang streaming dan semua WAL yang diterima sudah diputar ulang (replay timestamp tidak bergerak
+# saat primary tidak menulis; setelah restart receive LSN mulai dari awal segmen, di belakang replay). Replica yang receiver-nya terputus tidak lolos syarat kedua, sehingga
+# lag-nya dihitung dari replay timestamp dan terus bertambah; tanpa timestamp lag dianggap tak hingga.
+# Server yang tidak dalam recovery (mis. subscriber logical replication) dianggap tanpa lag.
+_REPLICA_LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_replay_lsn() >= %s::pg_lsn THEN 0
+        WHEN pg_last_wal_replay_lsn() >= pg_last_wal_receive_lsn()
+             AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8, 'Infinity')
+    END
+'''
+
+# Error yang membuat query dipindah ke replica berikutnya atau ke primary
+_REPLICA_ERRORS = (OperationalError, InterfaceError, PoolError)
+
+class _Replica:
+    """Satu read replica: pool koneksi sendiri, status sehat, lag terakhir, dan jumlah query."""
+
+    def __init__(self, dsn):
+        self.params = {
+            **_connection_params(),
+            "connect_timeout": REPLICA_CONNECT_TIMEOUT,
+            **psycopg2.extensions.parse_dsn(dsn),
+        }
+        self.name = f"{self.params.get('host')}:{self.params.get('port', '5432')}"
+        self.pool = None
+        self.slots = threading.BoundedSemaphore(DB_POOL_MAX)
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.queries = 0
+        self.checked_at = float("-inf")
+        self._check_lock = threading.Lock()
+
+    def check(self):
+        """Status sehat replica; diperiksa ulang jika pemeriksaan terakhir lebih dari REPLICA_CHECK_INTERVAL."""
+        if time.monotonic() - self.checked_at < REPLICA_CHECK_INTERVAL:
+            return self.healthy
+        # Hanya satu thread yang memeriksa; thread lain memakai status terakhir tanpa menunggu
+        if not self._check_lock.acquire(blocking=False):
+            return self.healthy
+        try:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, connection_factory=_Connection,
+                                                   **self.params)
+            primary_lsn = _primary_wal_lsn()
+            with _borrow(self.pool, self.slots) as cur:
+                cur.execute(_REPLICA_LAG_QUERY, [primary_lsn])
+                self.lag = float(cur.fetchone()[0])
+            if self.lag > REPLICA_MAX_LAG:
+                self._set_status(False, f"lag {self.lag:.1f} detik melebihi REPLICA_MAX_LAG={REPLICA_MAX_LAG:g}")
+            else:
+                self._set_status(True)
+        except (DatabaseError, InterfaceError, PoolError) as e:
+            self._set_status(False, " ".join(str(e).split()))
+        finally:
+            self.checked_at = time.monotonic()
+            self._check_lock.release()
+        return self.healthy
+
+    def mark_unhealthy(self, error):
+        """Keluarkan replica dari rotasi sampai pemeriksaan berikutnya."""
+        self.checked_at = time.monotonic()
+        self._set_status(False, " ".join(str(error).split()))
+
+    def _set_status(self, healthy, error=None):
+        if healthy and not self.healthy:
+            print(f"✅ Read replica {self.name} dipakai (lag {self.lag:.1f} detik)")
+        elif not healthy and (self.healthy or self.error is None):
+            print(f"⚠️  Read replica {self.name} tidak dipakai: {error}")
+        self.healthy, self.error = healthy, error
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+        self.healthy = False
+        self.checked_at = float("-inf")
+
+def _primary_wal_lsn():
+    """Posisi WAL primary saat ini (teks pg_lsn), atau None jika pool primary belum terbuka.
+
+    Pemeriksaan replica tidak membuka koneksi ke primary: tanpa pool primary, lag diukur dari
+    sisi replica saja (WAL diterima vs diputar ulang, replay timestamp).
+    """
+    if pool is None:
+        return None
+    try:
+        with get_cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text")
+            return cur.fetchone()[0]
+    except (DatabaseError, InterfaceError, PoolError):
+        return None
+
+_replicas = [_Replica(dsn) for dsn in DB_REPLICA_DSNS]
+_replica_turn = itertools.count()
+_primary_reads = 0
+
+def _replica_order():
+    """Replica sehat dalam urutan round-robin: setiap query dimulai dari replica berikutnya."""
+    healthy = [replica for replica in _replicas if replica.check()]
+    if not healthy:
+        return []
+    start = next(_replica_turn) % len(healthy)
+    return healthy[start:] + healthy[:start]
+
+def run_read(work):
+    """Jalankan work(cur) untuk query baca di read replica sehat, atau di primary.
+
+    Jika replica gagal (koneksi putus, pool penuh, query dibatalkan karena konflik recovery),
+    replica itu dikeluarkan dari rotasi dan work dijalankan ulang di replica berikutnya, lalu
+    di primary. work harus aman diulang dari awal.
+    """
+    global _primary_reads
+    for replica in _replica_order():
+        try:
+            with _borrow(replica.pool, replica.slots) as cur:
+                result = work(cur)
+            replica.queries += 1
+            return result
+        except QueryCanceledError:
+            raise  # Timeout atau pembatalan, bukan tanda replica bermasalah
+        except _REPLICA_ERRORS as e:
+            replica.mark_unhealthy(e)
+    with get_cursor() as cur:
+        result = work(cur)
+    _primary_reads += 1
+    return result
+
+def replica_status():
+    """Status setiap read replica (kosong jika DB_REPLICA_DSNS tidak diisi)."""
+    status = {
+        replica.name: {
+            "healthy": replica.healthy,
+            "lag": replica.lag,
+            "queries": replica.queries,
+            "error": replica.error,
+        }
+        for replica in _replicas
+    }
+    if status:
+        status["primary"] = {
+            "healthy": pool is not None, "lag": 0.0, "queries": _primary_reads,
+            "error": None if pool is not None else "belum terhubung / offline",
+        }
+    return status
+
+# ============================
+# Cache data untuk semua loader (TTL per dataset, batas ukuran, hit/miss)
+# ============================
+# Lama data disimpan di cache per dataset (detik), bisa diatur lewat .env
+CACHE_TTL = {
+    "customers": int(os.getenv("CACHE_TTL_CUSTOMERS", "300")),
+    "products": int(os.getenv("CACHE_TTL_PRODUCTS", "300")),
+    "orders": int(os.getenv("CACHE_TTL_ORDERS", "120")),
+    "order_details": int(os.getenv("CACHE_TTL_ORDER_DETAILS", "120")),
+    "summary": int(os.getenv("CACHE_TTL_SUMMARY", "60")),
+    "rollups": int(os.getenv("CACHE_TTL_ROLLUPS", "300")),
+}
+# Batas cache: jumlah hasil query dan total ukurannya di memori (MB, 0 = tanpa batas ukuran).
+# Entri paling lama tidak dipakai dibuang lebih dulu sampai keduanya terpenuhi. Frame bersama
+# (FILTER_MODE=shared) di-pin: tidak dihitung dalam batas ini dan tidak pernah dibuang
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "64"))
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", "512"))
+
+_cache = DataCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=int(CACHE_MAX_MB * 1024 * 1024) if CACHE_MAX_MB > 0 else None
+)
+
+# Refresh incremental untuk orders/order_details: saat cache kedaluwarsa hanya baris baru
+# (id di atas watermark) yang diambil. Muatan penuh tetap dilakukan berkala agar perubahan
+# dan penghapusan baris lama ikut terbawa.
+INCREMENTAL_REFRESH = os.getenv("INCREMENTAL_REFRESH", "1") == "1"
+FULL_RELOAD_INTERVAL = int(os.getenv("FULL_RELOAD_INTERVAL", "3600"))
+
+# ============================
+# Statement timeout per dataset dan pembatalan query milik rerun yang sudah digantikan
+# ============================
+# Batas waktu satu query di server (milidetik), per dataset loader; 0 = pakai setelan server
+STATEMENT_TIMEOUT = int(os.getenv("STATEMENT_TIMEOUT", "30000"))
+STATEMENT_TIMEOUTS = {
+    dataset: int(os.getenv(f"STATEMENT_TIMEOUT_{dataset.upper()}", str(STATEMENT_TIMEOUT)))
+    for dataset in CACHE_TTL
+}
+# Export CSV bisa lama untuk tabel besar, default tanpa batas
+STATEMENT_TIMEOUTS["export"] = int(os.getenv("STATEMENT_TIMEOUT_EXPORT", "0"))
+# Muatan penuh tanpa filter (frame bersama dan tabel dimensi) juga sebanding dengan ukuran tabel dan
+# dipakai semua session, jadi tidak memakai batas per dataset di atas; default tanpa batas
+STATEMENT_TIMEOUTS["full"] = int(os.getenv("STATEMENT_TIMEOUT_FULL", "0"))
+# Seberapa sering load_parallel memeriksa apakah rerun sudah digantikan (detik)
+CANCEL_POLL_INTERVAL = float(os.getenv("CANCEL_POLL_INTERVAL", "0.1"))
+
+_statement_timeout = contextvars.ContextVar("statement_timeout", default=STATEMENT_TIMEOUT)
+_query_scope = contextvars.ContextVar("query_scope", default=None)
+
+class QueryScope:
+    """Koneksi yang sedang menjalankan query untuk satu rerun; cancel() menghentikan query-nya di server.
+
+    stop_check (opsional) dipanggil berkala selama load_parallel menunggu, dan melempar exception
+    jika rerun ini harus berhenti (mis. yield check Streamlit saat ada rerun baru).
+    """
+
+    def __init__(self, stop_check=None):
+        self.stop_check = stop_check
+        self.cancelled = False
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCanceledError("Query dibatalkan: rerun sudah digantikan rerun baru")
+            self._connections.add(conn)
+        try:
+            yield
+        finally:
+            # Lock yang sama dengan cancel(): koneksi baru kembali ke pool setelah permintaan cancel terkirim,
+            # sehingga pembatalan tidak mengenai query berikutnya di koneksi itu
+            with self._lock:
+                self._connections.discard(conn)
+
+    def cancel(self):
+        """Tandai scope dibatalkan dan kirim pembatalan ke semua query yang sedang berjalan."""
+        with self._lock:
+            self.cancelled = True
+            for conn in self._connections:
+                try:
+                    conn.cancel()
+                except (OperationalError, InterfaceError):
+                    pass  # Koneksi sudah putus, query-nya ikut berhenti
+            return len(self._connections)
+
+def start_query_scope(stop_check=None):
+    """Mulai scope query untuk rerun yang sedang berjalan (dipanggil di awal script)."""
+    scope = QueryScope(stop_check)
+    _query_scope.set(scope)
+    return scope
+
+@contextmanager
+def _not_cancellable():
+    """Query di dalam blok tidak ikut dibatalkan scope, untuk data yang dipakai bersama semua session."""
+    token = _query_scope.set(None)
+    try:
+        yield
+    finally:
+        _query_scope.reset(token)
+
+def _track_query(cur):
+    scope = _query_scope.get()
+    return scope.track(cur.connection) if scope is not None else nullcontext()
+
+def _with_timeout(query, timeout):
+    """Awali query dengan SET LOCAL statement_timeout (satu round trip, berlaku sampai transaksi selesai)."""
+    return f"SET LOCAL statement_timeout = {int(timeout)}; {query}" if timeout else query
+
+# ============================
+# Snapshot di disk: cold start dari file lokal dan tetap melayani data saat database tidak terhubung
+# ============================
+# Hanya loader dataset dasar yang memakai snapshot (frame lengkap, tabel dimensi, ringkasan, batas filter,
+# agregat materialized view): kuncinya tetap, sehingga jumlah file terbatas. Hasil per filter, halaman,
+# dan top-N tidak disimpan agar tidak menggeser snapshot yang dibutuhkan mode offline.
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots"))
+SNAPSHOT_MAX_FILES = int(os.getenv("SNAPSHOT_MAX_FILES", "256"))
+# Jeda minimum antar penulisan snapshot dari refresh incremental per kunci (detik); full reload selalu menulis
+SNAPSHOT_MIN_INTERVAL = float(os.getenv("SNAPSHOT_MIN_INTERVAL", "600"))
+
+_snapshots = SnapshotStore(SNAPSHOT_DIR, max_files=SNAPSHOT_MAX_FILES) if SNAPSHOT_ENABLED else None
+_snapshot_seen = set()  # (dataset, key) yang sudah pernah dimuat di proses ini
+_snapshot_served = {}  # (dataset, key) -> (saved_at, offline) untuk data yang sedang dilayani dari snapshot
+_snapshot_pending = {}  # (dataset, key) -> Event, di-set setelah snapshot masuk cache
+_snapshot_written = {}  # (dataset, key) -> waktu (monotonic) penulisan snapshot terakhir dijadwalkan
+_snapshot_lock = threading.Lock()
+# Penulisan snapshot berjalan berurutan di thread sendiri, tidak memakai slot thread loader
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+
+# Error yang berarti database tidak bisa dihubungi (bukan kesalahan query)
+_OFFLINE_ERRORS = (OperationalError, InterfaceError)
+
+def _save_snapshot(dataset, key, value):
+    try:
+        _snapshots.save(dataset, key, value)
+    except Exception as e:
+        print(f"⚠️ Gagal menyimpan snapshot {dataset}: {str(e)}")
+
+def _loaded_fresh(dataset, key, value, incremental=False):
+    """Catat bahwa data terbaru sudah dimuat dari database, lalu simpan snapshot-nya di latar belakang.
+
+    Hasil refresh incremental hanya ditulis jika snapshot kunci ini terakhir ditulis lebih dari
+    SNAPSHOT_MIN_INTERVAL detik lalu, karena setiap penulisan menyimpan ulang seluruh frame.
+    """
+    now = time.monotonic()
+    with _snapshot_lock:
+        _snapshot_served.pop((dataset, key), None)
+        if incremental and now - _snapshot_written.get((dataset, key), float("-inf")) < SNAPSHOT_MIN_INTERVAL:
+            return
+        _snapshot_written[(dataset, key)] = now
+    _snapshot_executor.submit(_save_snapshot, dataset, key, value)
+
+def _reload_in_background(dataset, key, loader, snapshot_cached, timeout):
+    """Muat ulang dari database setelah cold start dilayani dari snapshot, lalu ganti isi cache."""
+    token = _statement_timeout.set(timeout)
+    try:
+        value = loader()
+    except QueryCanceledError as e:
+        print(f"⚠️ Refresh {dataset} dihentikan, snapshot tetap dipakai: {str(e).strip()}")
+        return
+    except _OFFLINE_ERRORS as e:
+        print(f"⚠️ Refresh {dataset} gagal, snapshot tetap dipakai: {str(e)}")
+        with _snapshot_lock:
+            if (dataset, key) in _snapshot_served:
+                _snapshot_served[(dataset, key)] = (_snapshot_served[(dataset, key)][0], True)
+        return
+    except Exception as e:
+        print(f"❌ ERROR saat refresh {dataset} di latar belakang: {str(e)}")
+        return
+    finally:
+        _statement_timeout.reset(token)
+    # Tunggu snapshot selesai disimpan ke cache agar data baru tidak tertimpa olehnya
+    snapshot_cached.wait(timeout=60)
+    _cache.put(dataset, key, value, CACHE_TTL[dataset])
+    _loaded_fresh(dataset, key, value)
+
+def _load_with_snapshot(dataset, key, loader, timeout):
+    """Jalankan loader dengan dukungan snapshot.
+
+    Saat cold start (kunci belum pernah dimuat di proses ini) snapshot langsung dilayani dan
+    loader dijalankan di latar belakang. Jika database tidak terhubung, snapshot terakhir dipakai.
+    """
+    if _snapshots is None:
+        return loader()
+    with _snapshot_lock:
+        cold = (dataset, key) not in _snapshot_seen
+        _snapshot_seen.add((dataset, key))
+    if cold:
+        snapshot = _snapshots.load(dataset, key)
+        if snapshot is not None:
+            value, saved_at = snapshot
+            snapshot_cached = threading.Event()
+            with _snapshot_lock:
+                _snapshot_served[(dataset, key)] = (saved_at, False)
+                _snapshot_pending[(dataset, key)] = snapshot_cached
+            _loader_executor.submit(_reload_in_background, dataset, key, loader, snapshot_cached, timeout)
+            return value
+    try:
+        value = loader()
+    except QueryCanceledError:
+        raise  # Timeout atau pembatalan bukan mode offline
+    except _OFFLINE_ERRORS:
+        snapshot = _snapshots.load(dataset, key)
+        if snapshot is None:
+            raise
+        value, saved_at = snapshot
+        with _snapshot_lock:
+            _snapshot_served[(dataset, key)] = (saved_at, True)
+        return value
+    _loaded_fresh(dataset, key, value)
+    return value
+
+def _refresh_or_keep(dataset, key, refresh, snapshot=False):
+    """Bungkus refresh incremental: snapshot ikut diperbarui (jika snapshot=True, dibatasi
+    SNAPSHOT_MIN_INTERVAL), dan jika database tidak terhubung data lama di cache tetap dipakai."""
+    def wrapper(old_value):
+        try:
+            value = refresh(old_value)
+        except QueryCanceledError:
+            raise
+        except _OFFLINE_ERRORS as e:
+            print(f"⚠️ Refresh incremental gagal, data lama tetap dipakai: {str(e)}")
+            return old_value
+        if snapshot and _snapshots is not None and value is not old_value:
+            _loaded_fresh(dataset, key, value, incremental=True)
+        return value
+    return wrapper
+
+def _get_or_load(dataset, key, loader, refresh=None, snapshot=False, timeout=None):
+    if timeout is None:
+        timeout = STATEMENT_TIMEOUTS[dataset]
+    token = _statement_timeout.set(timeout)
+    try:
+        value = _cache.get_or_load(
+            dataset, key,
+            (lambda: _load_with_snapshot(dataset, key, loader, timeout)) if snapshot else loader,
+            CACHE_TTL[dataset],
+            refresh=(_refresh_or_keep(dataset, key, refresh, snapshot)
+                     if refresh is not None and INCREMENTAL_REFRESH else None),
+            full_reload_after=FULL_RELOAD_INTERVAL
+        )
+    finally:
+        _statement_timeout.reset(token)
+    if _snapshot_pending:
+        with _snapshot_lock:
+            snapshot_cached = _snapshot_pending.pop((dataset, key), None)
+        if snapshot_cached is not None:
+            snapshot_cached.set()
+    return value
+
+def snapshot_status():
+    """Ringkasan data yang sedang dilayani dari snapshot: None, atau dict dengan
+    saved_at (snapshot tertua), offline (database tidak terhubung), dan datasets."""
+    with _snapshot_lock:
+        served = dict(_snapshot_served)
+    if not served:
+        return None
+    return {
+        "saved_at": min(saved_at for saved_at, _ in served.values()),
+        "offline": any(offline for _, offline in served.values()),
+        "datasets": sorted({dataset for dataset, _ in served}),
+    }
+
+# ============================
+# Prepared statement: query loader di-parse dan di-plan sekali per koneksi pool
+# ============================
+# Default mati untuk transaction pooler Supabase (port 6543), yang tidak mendukung prepared statement
+PREPARED_STATEMENTS = os.getenv("PREPARED_STATEMENTS", "0" if os.getenv("DB_PORT") == "6543" else "1") == "1"
+# Batas prepared statement per koneksi; yang paling lama tidak dipakai di-DEALLOCATE
+PREPARED_MAX_PER_CONNECTION = int(os.getenv("PREPARED_MAX_PER_CONNECTION", "64"))
+# Jeda antar pembacaan jumlah generic/custom plan dari pg_prepared_statements per koneksi (detik)
+PREPARED_STATS_INTERVAL = float(os.getenv("PREPARED_STATS_INTERVAL", "10"))
+
+class _Connection(psycopg2.extensions.connection):
+    """Koneksi pool yang mengingat prepared statement miliknya (urut pemakaian):
+    nama -> (generic_plans, custom_plans) terakhir dibaca dari pg_prepared_statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = OrderedDict()
+        self.plans_checked_at = time.monotonic()
+
+# Statistik per nama statement: label, planning time, jumlah prepare/eksekusi, dan jumlah generic/custom plan
+_prepared_stats = {}
+_unpreparable = set()
+_prepared_lock = threading.Lock()
+
+def _numbered_placeholders(query):
+    """Ubah placeholder %s psycopg2 menjadi $1, $2, ... untuk PREPARE; (None, 0) jika ada placeholder bernama."""
+    if "%(" in query:
+        return None, 0
+    count = 0
+    def number(_):
+        nonlocal count
+        count += 1
+        return f"${count}"
+    return "%".join(re.sub(r"%s", number, part) for part in query.split("%%")), count
+
+def _planning_ms(cur, query, params):
+    cur.execute(f"EXPLAIN (SUMMARY, FORMAT JSON) {query}", params)
+    plan = cur.fetchone()[0]
+    return float((json.loads(plan) if isinstance(plan, str) else plan)[0]["Planning Time"])
+
+def _prepare(cur, query, params, label):
+    """Nama prepared statement untuk query di koneksi cursor (PREPARE jika belum), atau None.
+
+    None berarti query dijalankan biasa: fitur dimatikan, parameter bukan list/tuple, lebih dari satu
+    statement, atau PREPARE gagal (mis. tipe parameter tidak bisa ditentukan). Planning time query
+    diukur sekali dengan EXPLAIN sebelum PREPARE, sehingga pembatalan di tengah jalan tidak
+    meninggalkan statement yang tercatat di koneksi tanpa statistiknya.
+    """
+    conn = cur.connection
+    if (not PREPARED_STATEMENTS or not isinstance(conn, _Connection) or query in _unpreparable
+            or not isinstance(params, (list, tuple, type(None)))):
+        return None
+    name = "dash_" + hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    if name in conn.prepared:
+        conn.prepared.move_to_end(name)
+        return name
+    numbered, count = _numbered_placeholders(query)
+    if numbered is None or count != len(params or ()) or ";" in query:
+        _unpreparable.add(query)
+        return None
+    planning_ms = None if name in _prepared_stats else _planning_ms(cur, query, params)
+    try:
+        cur.execute(f"PREPARE {name} AS {numbered}")
+    except DuplicatePreparedStatement:
+        # Statement sudah ada di sesi tapi tidak tercatat di koneksi: pakai yang sudah ada
+        conn.rollback()
+    except psycopg2.ProgrammingError as e:
+        conn.rollback()
+        _unpreparable.add(query)
+        print(f"⚠️ Query {label} dijalankan tanpa prepared statement: {str(e).strip()}")
+        return None
+    # Statement dan statistiknya dicatat bersamaan, tanpa query lain di antaranya
+    with _prepared_lock:
+        stats = _prepared_stats.setdefault(name, {
+            "label": label, "name": name, "planning_ms": planning_ms,
+            "prepares": 0, "executions": 0, "generic_plans": None, "custom_plans": None,
+        })
+        stats["prepares"] += 1
+    conn.prepared[name] = (0, 0)
+    if len(conn.prepared) > PREPARED_MAX_PER_CONNECTION:
+        # Dilupakan setelah DEALLOCATE berhasil: jika dibatalkan, statement lama tetap tercatat dan valid
+        evicted = next(iter(conn.prepared))
+        cur.execute(f"DEALLOCATE {evicted}")
+        del conn.prepared[evicted]
+    return name
+
+def _refresh_plan_counts(cur):
+    """Tambahkan generic/custom plan yang dipakai koneksi cursor sejak pembacaan terakhir ke statistik.
+
+    Jumlahnya dibaca dari pg_prepared_statements (kolom generic_plans/custom_plans, PostgreSQL 14+),
+    jadi eksekusi yang tetap memakai custom plan (plan_cache_mode=auto) tidak ikut dihitung hemat.
+    """
+    conn = cur.connection
+    conn.plans_checked_at = time.monotonic()
+    cur.execute(
+        "SELECT name, generic_plans, custom_plans FROM pg_prepared_statements WHERE name = ANY(%s)",
+        [list(conn.prepared)]
+    )
+    with _prepared_lock:
+        for name, generic, custom in cur.fetchall():
+            seen_generic, seen_custom = conn.prepared[name]
+            conn.prepared[name] = (generic, custom)
+            stats = _prepared_stats.get(name)
+            if stats is not None:
+                stats["generic_plans"] = (stats["generic_plans"] or 0) + generic - seen_generic
+                stats["custom_plans"] = (stats["custom_plans"] or 0) + custom - seen_custom
+
+def _execute(cur, query, params, label, timeout):
+    """Jalankan query lewat prepared statement milik koneksi jika bisa, selain itu query biasa."""
+    name = _prepare(cur, query, params, label)
+    if name is None:
+        cur.execute(_with_timeout(query, timeout), params)
+        return
+    conn = cur.connection
+    if conn.server_version >= 140000 and time.monotonic() - conn.plans_checked_at >= PREPARED_STATS_INTERVAL:
+        _refresh_plan_counts(cur)
+    placeholders = f"({', '.join(['%s'] * len(params))})" if params else ""
+    try:
+        cur.execute(_with_timeout(f"EXECUTE {name}{placeholders}", timeout), params)
+    except InvalidSqlStatementName:
+        # Statement hilang dari sesi (mis. lewat connection pooler): lupakan yang hilang saja,
+        # statement lain tetap tercatat dan dipakai, lalu jalankan query biasa
+        cur.connection.rollback()
+        cur.connection.prepared.pop(name, None)
+        cur.execute(_with_timeout(query, timeout), params)
+        return
+    with _prepared_lock:
+        stats = _prepared_stats.get(name)
+        if stats is not None:
+            stats["executions"] += 1
+
+def prepared_statement_stats():
+    """Statistik prepared statement per query: label, planning_ms (diukur sekali), prepares (jumlah koneksi),
+    executions, generic_plans/custom_plans, dan saved_ms = generic_plans × planning_ms.
+
+    Jumlah plan diperbarui paling cepat setiap PREPARED_STATS_INTERVAL detik per koneksi; None jika
+    belum terbaca atau server lebih lama dari PostgreSQL 14.
+    """
+    with _prepared_lock:
+        return {
+            name: dict(stats, saved_ms=None if stats["generic_plans"] is None
+                       else stats["generic_plans"] * stats["planning_ms"])
+            for name, stats in _prepared_stats.items()
+        }
+
+def _fetch_rows(query, params=None, fetch="all", label="query"):
+    timeout = _statement_timeout.get()
+    def work(cur):
+        with _track_query(cur):
+            _execute(cur, query, params, label, timeout)
+            return cur.fetchall() if fetch == "all" else cur.fetchone()
+    with perf.stage(f"sql:{label}", "sql") as current:
+        return current.record(run_read(work))
+
+def cached_query(dataset, query, params=None, fetch="all", refresh=None, snapshot=False):
+    """Jalankan query SELECT lewat cache: hasil disimpan selama TTL dataset.
+
+    Kunci cache adalah teks query + parameternya, sehingga setiap kombinasi filter punya entri sendiri.
+    refresh(baris_lama) opsional dipakai untuk memperbarui entri kedaluwarsa secara incremental.
+    snapshot=True juga menyimpan hasilnya di disk (hanya untuk dataset dasar berkunci tetap).
+    Error dari database diteruskan dan tidak ikut di-cache.
+    """
+    return _get_or_load(
+        dataset, (query, repr(params), fetch),
+        lambda: _fetch_rows(query, params, fetch, label=dataset),
+        refresh=refresh, snapshot=snapshot
+    )
+
+# ============================
+# Fetch bertipe: hasil query langsung menjadi DataFrame dengan dtype native
+# ============================
+# Kolom turunan yang dihitung di SQL, dipakai oleh fetch bertipe dan export
+_DERIVED_COLUMNS = {
+    # Usia penuh dalam tahun dari age(), tepat di sekitar hari ulang tahun
+    "customers": {"Age": "extract(year from age(current_date, birthdate))"},
+    "products": {},
+    "orders": {"month": "to_char(order_date, 'YYYY-MM')", "day": "order_date::date"},
+    "order_details": {"day": "order_date::date"},
+    "order_detail_facts": {"day": "order_date::date"},
+}
+
+# Tipe kolom DataFrame per dataset: int, float, datetime, str, atau category.
+# category dipakai untuk teks yang berulang di banyak baris (nama pelanggan/produk per item pesanan):
+# setiap nilai unik disimpan sekali, dan groupby berjalan pada kode integer.
+FRAME_SCHEMAS = {
+    "customers": {
+        "customer_id": "int", "name": "str", "email": "str", "phone": "str",
+        "address": "str", "birthdate": "datetime", "Age": "int",
+    },
+    "products": {
+        "product_id": "int", "name": "str", "description": "str", "price": "float", "stock": "int",
+    },
+    "orders": {
+        "order_id": "int", "order_date": "datetime", "total_amount": "float",
+        "customer_name": "str", "phone": "str", "month": "str", "day": "datetime",
+    },
+    "order_details": {
+        "order_detail_id": "int", "order_id": "int", "order_date": "datetime", "customer_id": "int",
+        "customer_name": "category", "product_id": "int", "product_name": "category", "unit_price": "float",
+        "quantity": "int", "subtotal": "float", "order_total": "float", "phone": "category", "day": "datetime",
+    },
+    # Tabel fakta sempit untuk mode fetch "star" (lihat view_order_details_filtered)
+    "order_detail_facts": {
+        "order_detail_id": "int", "order_id": "int", "order_date": "datetime", "customer_id": "int",
+        "product_id": "int", "quantity": "int", "subtotal": "float", "order_total": "float", "day": "datetime",
+    },
+    # Materialized view agregat (lihat maintenance.py)
+    "mv_monthly_revenue": {"month": "str", "total_amount": "float", "jumlah_pesanan": "int"},
+    "mv_daily_revenue": {"day": "datetime", "total_amount": "float", "jumlah_pesanan": "int"},
+    "mv_customer_totals": {"customer_name": "str", "jumlah_pesanan": "int", "total_pembelian": "float"},
+    "mv_product_sales": {"product_name": "str", "quantity": "int", "subtotal": "float", "jumlah_pesanan": "int"},
+    "mv_daily_sales": {"day": "datetime", "total_quantity": "int", "total_revenue": "float"},
+    # Top-N + "Lainnya" untuk pie chart (lihat view_top_n)
+    "top_n": {"label": "str", "value": "float"},
+}
+
+# Cast SQL per tipe: angka dikirim sebagai int8/float8 (bukan Decimal),
+# tanggal sebagai detik epoch sehingga bisa dikonversi ke datetime64 sekaligus
+_SQL_CASTS = {
+    "int": "({})::int8",
+    "float": "({})::float8",
+    "datetime": "extract(epoch from {})::float8",
+    "str": "({})::text",
+    "category": "({})::text",
+}
+
+def _typed_column(values, kind):
+    """Ubah satu kolom hasil fetch menjadi array numpy/pandas dengan dtype native."""
+    if kind == "int":
+        try:
+            return np.array(values, dtype="int64")
+        except TypeError:
+            return np.array(values, dtype="float64")  # Ada NULL: pakai float64 dengan NaN
+    if kind == "float":
+        return np.array(values, dtype="float64")
+    if kind == "datetime":
+        return pd.to_datetime(np.array(values, dtype="float64"), unit="s")
+    if kind == "category":
+        return pd.Categorical(np.array(values, dtype=object))
+    return np.array(values, dtype=object)
+
+def _fetch_frame(dataset, query, params=None):
+    """Jalankan query dataset dengan cast per kolom dan bangun DataFrame kolom demi kolom."""
+    schema = FRAME_SCHEMAS[dataset]
+    derived = _DERIVED_COLUMNS.get(dataset, {})
+    select_list = ", ".join(
+        _SQL_CASTS[kind].format(derived.get(col, f'"{col}"')) + f' AS "{col}"'
+        for col, kind in schema.items()
+    )
+    rows = _fetch_rows(f"SELECT {select_list} FROM ({query}) AS t", params, label=dataset)
+    with perf.stage(f"frame:{dataset}", "frame") as current:
+        columns = list(zip(*rows)) if rows else [()] * len(schema)
+        return current.record(pd.DataFrame({
+            col: _typed_column(values, kind)
+            for (col, kind), values in zip(schema.items(), columns)
+        }))
+
+def empty_frame(dataset):
+    """DataFrame kosong dengan kolom dan dtype dataset, dipakai saat query gagal."""
+    return pd.DataFrame({col: _typed_column([], kind) for col, kind in FRAME_SCHEMAS[dataset].items()})
+
+def _frame_key(query, params=None):
+    """Kunci cache hasil cached_frame untuk query dan parameternya."""
+    return query, repr(params), "frame"
+
+def cached_frame(dataset, query, params=None, refresh=None, schema=None, snapshot=False, timeout=None):
+    """Seperti cached_query, tetapi hasilnya DataFrame bertipe dari _fetch_frame.
+
+    schema memilih entri FRAME_SCHEMAS jika berbeda dari nama dataset cache.
+    timeout (milidetik) menggantikan statement timeout dataset, mis. STATEMENT_TIMEOUTS["full"].
+    """
+    return _get_or_load(
+        dataset, _frame_key(query, params),
+        lambda: _fetch_frame(schema or dataset, query, params),
+        refresh=refresh, snapshot=snapshot, timeout=timeout
+    )
+
+def _incremental_refresh(dataset, build_query, id_column, **filters):
+    """Buat fungsi refresh yang mengambil baris dengan id > watermark lalu menggabungkannya.
+
+    build_query harus menerima argumen after_id; baris baru diletakkan di depan agar urutan
+    order_date DESC tetap terjaga.
+    """
+    def refresh(old_df):
+        if old_df.empty:
+            return _fetch_frame(dataset, *build_query(**filters))
+        watermark = int(old_df[id_column].max())
+        new_df = _fetch_frame(dataset, *build_query(after_id=watermark, **filters))
+        if new_df.empty:
+            return old_df
+        # Samakan kategori agar kolom category tidak berubah menjadi object saat digabung
+        for col in new_df.select_dtypes("category").columns:
+            categories = old_df[col].cat.categories.union(new_df[col].cat.categories)
+            old_df = old_df.assign(**{col: old_df[col].cat.set_categories(categories)})
+            new_df[col] = new_df[col].cat.set_categories(categories)
+        merged = pd.concat([new_df, old_df], ignore_index=True)
+        # Pesanan baru dengan tanggal mundur: urutkan ulang agar tetap order_date DESC
+        if new_df["order_date"].iloc[-1] < old_df["order_date"].iloc[0]:
+            merged = merged.sort_values("order_date", ascending=False, kind="stable", ignore_index=True)
+        return merged
+    return refresh
+
+def invalidate_cache(dataset=None, key=None):
+    """Kosongkan cache semua dataset, satu dataset saja (misalnya "orders"), atau satu entri dataset."""
+    _cache.invalidate(dataset, key)
+
+def cache_stats():
+    """Statistik cache per dataset: hits, misses, evictions, entries, bytes, pinned_bytes (frame bersama)."""
+    return _cache.stats()
+
+# ============================
+# Frame bersama: satu salinan dataset lengkap per proses, difilter per session dengan mask
+# ============================
+# "shared": orders/order_details dimuat lengkap sekali dan dipakai bersama semua session, lalu filter
+# diterapkan in-memory; "sql": setiap kombinasi filter menjadi query dan entri cache sendiri
+FILTER_MODE = os.getenv("FILTER_MODE", "shared")
+
+# Entri cache frame bersama per skema: skema -> (dataset cache, kunci cache), untuk statistik
+_shared_frames = {}
+# Sampel quick look per frame bersama: skema -> (versi cache frame, persen, sampel)
+_shared_samples = {}
+
+def shared_frame(dataset, build_query, id_column, schema=None, sample_percent=None, **query_kwargs):
+    """Frame dataset lengkap (tanpa filter) yang dipakai bersama oleh semua session.
+
+    Dimuat lewat cache dengan TTL dan refresh incremental seperti loader lain; setiap muatan
+    baru mendapat versi cache baru. Frame ini read-only, filter dengan filter_frame.
+    sample_percent mengembalikan sampel acak baris frame (quick look) tanpa query tambahan;
+    sampel dibuat sekali per versi frame.
+    """
+    name = schema or dataset
+    query, params = build_query(**query_kwargs)
+    key = _frame_key(query, params)
+    refresh = _incremental_refresh(name, build_query, id_column, **query_kwargs)
+    _shared_frames[name] = (dataset, key)
+    # Frame lengkap bisa melebihi CACHE_MAX_MB sendiri; tanpa pin entri ini tergeser oleh entri berikutnya
+    # dan setiap rerun menjadi muatan penuh alih-alih refresh incremental
+    _cache.pin(dataset, key)
+    # Tidak dibatalkan saat rerun: frame ini tetap dibutuhkan rerun berikutnya dan session lain
+    with _not_cancellable():
+        frame = cached_frame(dataset, query, params, refresh=refresh, schema=schema, snapshot=True,
+                             timeout=STATEMENT_TIMEOUTS["full"])
+    if sample_percent is None:
+        return frame
+    version, cached = _cache.entry(dataset, key)
+    current = _shared_samples.get(name)
+    if cached is frame and current is not None and current[:2] == (version, sample_percent):
+        return current[2]
+    # Urutan baris asli dipertahankan; seed tetap agar titik grafik tidak melompat antar rerun
+    sample = frame.sample(frac=min(sample_percent / 100, 1.0), random_state=QUICK_LOOK_SEED).sort_index()
+    if cached is frame:
+        _shared_samples[name] = (version, sample_percent, sample)
+    return sample
+
+_MASK_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "<": operator.lt,
+    "in": lambda column, values: column.isin(values),
+}
+
+def _day_start(day, offset_days=0):
+    """Awal hari (Timestamp) untuk filter tanggal in-memory, None jika tanggal tidak diisi."""
+    return None if day is None else pd.Timestamp(day) + pd.Timedelta(days=offset_days)
+
+@perf.timed("frame")
+def filter_frame(frame, conditions):
+    """Filter frame bersama dengan mask dari daftar (kolom, operator, nilai); nilai None dilewati.
+
+    Tanpa filter yang mempersempit hasil, frame bersama dikembalikan apa adanya (tanpa salinan);
+    selain itu hanya baris yang cocok yang disalin ke frame baru milik session.
+    """
+    mask = None
+    for column, op, value in conditions:
+        if value is None:
+            continue
+        matched = _MASK_OPERATORS[op](frame[column], value).to_numpy()
+        mask = matched if mask is None else mask & matched
+    if mask is None or mask.all():
+        return frame
+    return frame[mask]
+
+def shared_frame_stats():
+    """Versi cache, jumlah baris, dan ukuran (byte) frame bersama yang masih di cache, per skema."""
+    result = {}
+    for name, (dataset, key) in list(_shared_frames.items()):
+        version, frame = _cache.entry(dataset, key)
+        if frame is not None:
+            result[name] = {
+                "version": version,
+                "rows": len(frame),
+                "bytes": int(frame.memory_usage(index=True, deep=False).sum()),
+            }
+    return result
 
 # ============================
 # Fungsi ambil data dari tabel
 # ============================
 
+_CUSTOMERS_QUERY = '''
+    SELECT customer_id, name, email, phone, address, birthdate
+    FROM customers
+    ORDER BY name ASC
+'''
+
+@perf.timed("loader")
 def view_customers():
     try:
-        query = '''
+        return cached_frame("customers", _CUSTOMERS_QUERY, snapshot=True, timeout=STATEMENT_TIMEOUTS["full"])
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil data customers: {str(e)}")
+        return empty_frame("customers")
+
+def _build_where(conditions):
+    """Gabungkan daftar (potongan SQL, nilai) menjadi klausa WHERE berparameter.
+
+    Kondisi dengan nilai None dilewati, sehingga filter yang tidak diisi tidak ikut ke query.
+    """
+    clauses, params = [], []
+    for clause, value in conditions:
+        if value is None:
+            continue
+        clauses.append(clause)
+        params.append(value)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+# ============================
+# Quick look: grafik eksploratif dari sampel acak tabel (TABLESAMPLE)
+# ============================
+# Persentase halaman/baris tabel yang dibaca saat quick look aktif
+QUICK_LOOK_PERCENT = float(os.getenv("QUICK_LOOK_PERCENT", "5"))
+# SYSTEM memilih blok halaman acak (paling cepat, sampel bergerombol per halaman);
+# BERNOULLI memilih per baris (lebih merata, tetapi tetap membaca seluruh tabel)
+QUICK_LOOK_METHOD = os.getenv("QUICK_LOOK_METHOD", "SYSTEM").upper()
+# Seed REPEATABLE: sampel sama di setiap rerun sehingga titik grafik tidak melompat saat slider digeser
+QUICK_LOOK_SEED = int(os.getenv("QUICK_LOOK_SEED", "42"))
+
+if QUICK_LOOK_METHOD not in ("SYSTEM", "BERNOULLI"):
+    raise ValueError(f"QUICK_LOOK_METHOD harus SYSTEM atau BERNOULLI, bukan {QUICK_LOOK_METHOD}")
+
+def _tablesample(sample_percent=None):
+    """Klausa TABLESAMPLE untuk diletakkan setelah nama tabel di FROM, beserta parameternya.
+
+    Sampel diambil sebelum WHERE, jadi hasilnya kira-kira sample_percent% dari baris yang lolos filter.
+    Tanpa sample_percent, klausa kosong (hasil exact).
+    """
+    if sample_percent is None:
+        return "", []
+    return f"TABLESAMPLE {QUICK_LOOK_METHOD} (%s) REPEATABLE (%s)", [float(sample_percent), QUICK_LOOK_SEED]
+
+def _age_conditions(min_age=None, max_age=None):
+    """Filter rentang usia sebagai batas birthdate relatif ke current_date.
+
+    Usia >= min_age berarti birthdate <= hari ini - min_age tahun, dan usia <= max_age berarti
+    birthdate > hari ini - (max_age + 1) tahun, sehingga predikat bisa memakai index birthdate.
+    """
+    return [
+        ("birthdate <= (current_date - make_interval(years => %s))::date", min_age),
+        ("birthdate > (current_date - make_interval(years => %s + 1))::date", max_age),
+    ]
+
+@perf.timed("loader")
+def view_customers_page(page_size=50, after=None, min_age=None, max_age=None):
+    """Ambil satu halaman customers dengan keyset pagination pada (name, customer_id).
+
+    after: tuple (name, customer_id) dari baris terakhir halaman sebelumnya, None untuk halaman pertama.
+    min_age/max_age: rentang usia (inklusif); kolom Age dihitung di database.
+    """
+    try:
+        where, params = _build_where([
+            ("(name, customer_id) > %s", tuple(after) if after else None),
+        ] + _age_conditions(min_age, max_age))
+        query = f'''
             SELECT customer_id, name, email, phone, address, birthdate
             FROM customers
-            ORDER BY name ASC
+            {where}
+            ORDER BY name ASC, customer_id ASC
+            LIMIT %s
         '''
-        c.execute(query)
-        return c.fetchall()
+        return cached_frame("customers", query, params + [page_size])
     except Exception as e:
-        print(f"❌ ERROR saat mengambil data customers: {str(e)}")
-        return []
+        print(f"❌ ERROR saat mengambil halaman data customers: {str(e)}")
+        return empty_frame("customers")
 
-def view_orders_with_customers():
+def _customers_query(min_age=None, max_age=None):
+    """Susun query seluruh customers (tanpa LIMIT) sesuai filter usia, dipakai untuk export."""
+    where, params = _build_where(_age_conditions(min_age, max_age))
+    query = f'''
+        SELECT customer_id, name, email, phone, address, birthdate
+        FROM customers
+        {where}
+        ORDER BY name ASC, customer_id ASC
+    '''
+    return query, params
+
+@perf.timed("loader")
+def count_customers(min_age=None, max_age=None):
+    """Hitung jumlah customers yang cocok dengan filter usia."""
+    try:
+        where, params = _build_where(_age_conditions(min_age, max_age))
+        return cached_query("customers", f"SELECT COUNT(*) FROM customers {where}", params, fetch="one")[0]
+    except Exception as e:
+        print(f"❌ ERROR saat menghitung data customers: {str(e)}")
+        return 0
+
+@perf.timed("loader")
+def view_customers_bounds():
+    """Ambil batas filter customers: (usia_termuda, usia_tertua, jumlah_customers).
+
+    MIN/MAX birthdate dibaca dari index birthdate; usia dihitung dengan age() seperti kolom Age.
+    """
     try:
         query = '''
-            SELECT 
-                o.order_id, 
-                o.order_date, 
-                o.total_amount, 
-                c.name AS customer_name, 
-                c.phone 
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            ORDER BY o.order_date DESC
+            SELECT
+                extract(year from age(current_date, MAX(birthdate)))::int,
+                extract(year from age(current_date, MIN(birthdate)))::int,
+                COUNT(*)
+            FROM customers
         '''
-        c.execute(query)
-        return c.fetchall()
+        return cached_query("customers", query, fetch="one", snapshot=True)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil batas data customers: {str(e)}")
+        return None
+
+@perf.timed("loader")
+def view_orders_with_customers():
+    return view_orders_filtered()
+
+def _orders_query(date_from=None, date_to=None, min_amount=None, max_amount=None, after_id=None,
+                  sample_percent=None, ordered=True):
+    """Susun query orders + nama pelanggan beserta parameternya sesuai filter.
+
+    after_id membatasi ke order_id di atas watermark (dipakai refresh incremental).
+    sample_percent membaca sampel acak tabel orders (lihat _tablesample), dipakai mode quick look.
+    ordered=False menghilangkan ORDER BY untuk query yang langsung diagregasi (lihat view_top_n).
+    """
+    sample, sample_params = _tablesample(sample_percent)
+    where, params = _build_where([
+        ("o.order_id > %s", after_id),
+        ("o.order_date >= %s", date_from),
+        ("o.order_date < %s::date + 1", date_to),
+        ("o.total_amount >= %s", min_amount),
+        ("o.total_amount <= %s", max_amount),
+    ])
+    query = f'''
+        SELECT 
+            o.order_id, 
+            o.order_date, 
+            o.total_amount, 
+            c.name AS customer_name, 
+            c.phone 
+        FROM orders o {sample}
+        JOIN customers c ON o.customer_id = c.customer_id
+        {where}
+        {"ORDER BY o.order_date DESC" if ordered else ""}
+    '''
+    return query, sample_params + params
+
+@perf.timed("loader")
+def view_orders_filtered(date_from=None, date_to=None, min_amount=None, max_amount=None, sample_percent=None):
+    """Ambil orders + nama pelanggan dengan filter tanggal dan total amount.
+
+    FILTER_MODE "shared" memfilter frame bersama in-memory, "sql" memfilter di sisi database.
+    sample_percent (quick look) memfilter sampel acak: sampel frame bersama pada mode "shared",
+    TABLESAMPLE pada mode "sql".
+    """
+    try:
+        if FILTER_MODE == "shared":
+            base = shared_frame("orders", _orders_query, "order_id", sample_percent=sample_percent)
+            return filter_frame(base, [
+                ("order_date", ">=", _day_start(date_from)),
+                ("order_date", "<", _day_start(date_to, 1)),
+                ("total_amount", ">=", min_amount),
+                ("total_amount", "<=", max_amount),
+            ])
+        filters = dict(date_from=date_from, date_to=date_to, min_amount=min_amount, max_amount=max_amount)
+        if sample_percent is not None:
+            return cached_frame("orders", *_orders_query(**filters, sample_percent=sample_percent))
+        query, params = _orders_query(**filters)
+        refresh = _incremental_refresh("orders", _orders_query, "order_id", **filters)
+        return cached_frame("orders", query, params, refresh=refresh)
     except Exception as e:
         print(f"❌ ERROR saat mengambil data orders: {str(e)}")
-        return []
+        return empty_frame("orders")
 
-def view_products():
+@perf.timed("loader")
+def view_orders_bounds():
+    """Ambil batas filter orders: (min_tanggal, max_tanggal, min_amount, max_amount, jumlah_orders)."""
     try:
         query = '''
-            SELECT product_id, name, description, price, stock
-            FROM products
-            ORDER BY name ASC
+            SELECT
+                MIN(order_date)::date,
+                MAX(order_date)::date,
+                MIN(total_amount),
+                MAX(total_amount),
+                COUNT(*)
+            FROM orders
         '''
-        c.execute(query)
-        return c.fetchall()
+        return cached_query("orders", query, fetch="one", snapshot=True)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil batas data orders: {str(e)}")
+        return None
+
+_PRODUCTS_QUERY = '''
+    SELECT product_id, name, description, price, stock
+    FROM products
+    ORDER BY name ASC
+'''
+
+@perf.timed("loader")
+def view_products():
+    try:
+        return cached_frame("products", _PRODUCTS_QUERY, snapshot=True, timeout=STATEMENT_TIMEOUTS["full"])
     except Exception as e:
         print(f"❌ ERROR saat mengambil data products: {str(e)}")
-        return []
+        return empty_frame("products")
+
+def _products_query(min_price=None, max_price=None, min_stock=None, max_stock=None, ordered=True):
+    """Susun query products beserta parameternya sesuai filter harga dan stok.
 
+    ordered=False menghilangkan ORDER BY untuk query yang langsung diagregasi (lihat view_top_n).
+    """
+    where, params = _build_where([
+        ("price >= %s", min_price),
+        ("price <= %s", max_price),
+        ("stock >= %s", min_stock),
+        ("stock <= %s", max_stock),
+    ])
+    query = f'''
+        SELECT product_id, name, description, price, stock
+        FROM products
+        {where}
+        {"ORDER BY name ASC" if ordered else ""}
+    '''
+    return query, params
+
+@perf.timed("loader")
 def view_order_details_with_info():
+    return view_order_details_filtered()
+
+# Kolom hasil query detail pesanan: lengkap (join) atau hanya kolom fakta (star)
+_ORDER_DETAIL_COLUMNS = '''
+            od.order_detail_id,
+            o.order_id,
+            o.order_date,
+            c.customer_id,
+            c.name AS customer_name,
+            p.product_id,
+            p.name AS product_name,
+            p.price AS unit_price,
+            od.quantity,
+            od.subtotal,
+            o.total_amount AS order_total,
+            c.phone'''
+_ORDER_DETAIL_FACT_COLUMNS = '''
+            od.order_detail_id,
+            o.order_id,
+            o.order_date,
+            c.customer_id,
+            p.product_id,
+            od.quantity,
+            od.subtotal,
+            o.total_amount AS order_total'''
+
+# Mode fetch detail pesanan. "star": ambil tabel fakta sempit lalu gabungkan atribut pelanggan/produk
+# dari tabel dimensi yang di-cache terpisah (join_dimensions), hanya untuk kolom yang dibutuhkan.
+# "join": ambil hasil join lengkap dari database.
+DETAIL_FETCH_MODE = os.getenv("DETAIL_FETCH_MODE", "star")
+
+def _order_details_query(product_names=None, date_from=None, date_to=None,
+                         min_qty=None, max_qty=None, min_subtotal=None, max_subtotal=None, after_id=None,
+                         facts=False, sample_percent=None, ordered=True):
+    """Susun query detail pesanan beserta parameternya sesuai filter.
+
+    after_id membatasi ke order_detail_id di atas watermark (dipakai refresh incremental).
+    facts=True hanya memilih kolom fakta (id, tanggal, quantity, subtotal) tanpa atribut dimensi.
+    sample_percent membaca sampel acak tabel order_details (lihat _tablesample), dipakai mode quick look.
+    ordered=False menghilangkan ORDER BY untuk query yang langsung diagregasi (lihat view_top_n).
+    """
+    sample, sample_params = _tablesample(sample_percent)
+    where, params = _build_where([
+        ("od.order_detail_id > %s", after_id),
+        ("p.name = ANY(%s)", list(product_names) if product_names else None),
+        ("o.order_date >= %s", date_from),
+        ("o.order_date < %s::date + 1", date_to),
+        ("od.quantity >= %s", min_qty),
+        ("od.quantity <= %s", max_qty),
+        ("od.subtotal >= %s", min_subtotal),
+        ("od.subtotal <= %s", max_subtotal),
+    ])
+    query = f'''
+        SELECT {_ORDER_DETAIL_FACT_COLUMNS if facts else _ORDER_DETAIL_COLUMNS}
+        FROM order_details od {sample}
+        JOIN orders o ON od.order_id = o.order_id
+        JOIN customers c ON o.customer_id = c.customer_id
+        JOIN products p ON od.product_id = p.product_id
+        {where}
+        {"ORDER BY o.order_date DESC" if ordered else ""}
+    '''
+    return query, sample_params + params
+
+@perf.timed("loader")
+def view_order_details_filtered(product_names=None, date_from=None, date_to=None,
+                                min_qty=None, max_qty=None, min_subtotal=None, max_subtotal=None,
+                                sample_percent=None):
+    """Ambil detail pesanan dengan filter produk, tanggal, quantity, dan subtotal.
+
+    FILTER_MODE "shared" memfilter frame bersama in-memory, "sql" memfilter di sisi database.
+    sample_percent (quick look) memfilter sampel acak, seperti pada view_orders_filtered.
+    Pada mode "star" hasilnya tabel fakta (skema order_detail_facts); pakai join_dimensions untuk
+    menambahkan customer_name, phone, product_name, atau unit_price yang dibutuhkan.
+    """
+    schema = "order_detail_facts" if DETAIL_FETCH_MODE == "star" else "order_details"
+    try:
+        if FILTER_MODE == "shared":
+            base = shared_frame("order_details", _order_details_query, "order_detail_id", schema=schema,
+                                sample_percent=sample_percent, facts=schema == "order_detail_facts")
+            product_ids = None
+            if product_names:
+                # Filter nama produk lewat product_id, kolom yang ada di kedua mode fetch
+                products = view_products()
+                product_ids = products.loc[products["name"].isin(list(product_names)), "product_id"].to_numpy()
+            return filter_frame(base, [
+                ("product_id", "in", product_ids),
+                ("order_date", ">=", _day_start(date_from)),
+                ("order_date", "<", _day_start(date_to, 1)),
+                ("quantity", ">=", min_qty),
+                ("quantity", "<=", max_qty),
+                ("subtotal", ">=", min_subtotal),
+                ("subtotal", "<=", max_subtotal),
+            ])
+        filters = dict(product_names=product_names, date_from=date_from, date_to=date_to,
+                       min_qty=min_qty, max_qty=max_qty, min_subtotal=min_subtotal, max_subtotal=max_subtotal,
+                       facts=schema == "order_detail_facts")
+        if sample_percent is not None:
+            query, params = _order_details_query(**filters, sample_percent=sample_percent)
+            return cached_frame("order_details", query, params, schema=schema)
+        query, params = _order_details_query(**filters)
+        refresh = _incremental_refresh(schema, _order_details_query, "order_detail_id", **filters)
+        return cached_frame("order_details", query, params, refresh=refresh, schema=schema)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil data order_details: {str(e)}")
+        return empty_frame(schema)
+
+# Kolom dimensi untuk tabel fakta:
+# kolom -> (dataset cache, loader tabel dimensi, query loader, kolom kunci, kolom sumber)
+_DIMENSION_COLUMNS = {
+    "customer_name": ("customers", view_customers, _CUSTOMERS_QUERY, "customer_id", "name"),
+    "phone": ("customers", view_customers, _CUSTOMERS_QUERY, "customer_id", "phone"),
+    "product_name": ("products", view_products, _PRODUCTS_QUERY, "product_id", "name"),
+    "unit_price": ("products", view_products, _PRODUCTS_QUERY, "product_id", "price"),
+}
+
+@perf.timed("frame")
+def join_dimensions(facts, columns):
+    """Tambahkan kolom dimensi yang diminta ke frame fakta detail pesanan.
+
+    Kolom yang sudah ada (mode "join") atau bukan kolom dimensi dilewati. Kolom teks dibuat
+    sebagai category seperti pada skema order_details. Frame baru dikembalikan sehingga frame
+    di cache tidak ikut berubah.
+    """
+    joined = {}
+    for col in columns:
+        if col in facts.columns or col not in _DIMENSION_COLUMNS:
+            continue
+        dataset, load_dimension, query, key, source = _DIMENSION_COLUMNS[col]
+        dim = load_dimension()
+        positions = pd.Index(dim[key]).get_indexer(facts[key])
+        if (positions < 0).any():
+            # Fakta lebih baru dari cache dimensi (mis. pelanggan baru): muat ulang tabel dimensinya
+            # sekali, tanpa membuang entri cache lain milik dataset yang sama
+            invalidate_cache(dataset, _frame_key(query))
+            dim = load_dimension()
+            positions = pd.Index(dim[key]).get_indexer(facts[key])
+        # Baris tanpa pasangan dimensi (atau tabel dimensi kosong) menjadi NaN
+        found = positions >= 0
+        if FRAME_SCHEMAS["order_details"][col] == "category":
+            codes, categories = pd.factorize(dim[source])
+            joined_codes = np.full(len(positions), -1, dtype=codes.dtype)
+            joined_codes[found] = codes[positions[found]]
+            joined[col] = pd.Categorical.from_codes(joined_codes, categories=categories)
+        else:
+            values = dim[source].to_numpy(dtype="float64")
+            joined_values = np.full(len(positions), np.nan)
+            joined_values[found] = values[positions[found]]
+            joined[col] = joined_values
+    return facts.assign(**joined) if joined else facts
+
+# Loader baris per sumber quick look; sampel memakai filter yang sama dengan hasil exact-nya
+_SAMPLE_LOADERS = {
+    "orders": view_orders_filtered,
+    "order_details": view_order_details_filtered,
+}
+
+@perf.timed("loader")
+def view_sample(source, sample_percent=QUICK_LOOK_PERCENT, **filters):
+    """Sampel acak orders atau order_details dengan filter loader exact-nya, untuk quick look.
+
+    Skema hasil sama dengan loader exact (order_details mengikuti DETAIL_FETCH_MODE, jadi pakai
+    join_dimensions pada mode "star"). Pada FILTER_MODE "shared" sampel diambil dari frame bersama
+    tanpa query ke database. Hasil kosong berarti sampel tidak tersedia (mis. gagal atau tabel kecil).
+    """
+    return _SAMPLE_LOADERS[source](sample_percent=sample_percent, **filters)
+
+@perf.timed("loader")
+def view_order_details_bounds():
+    """Ambil batas filter detail pesanan:
+    (min_tanggal, max_tanggal, min_qty, max_qty, min_subtotal, max_subtotal, jumlah_baris)."""
     try:
         query = '''
-            SELECT 
-                od.order_detail_id,
-                o.order_id,
-                o.order_date,
-                c.customer_id,
-                c.name AS customer_name,
-                p.product_id,
-                p.name AS product_name,
-                p.price AS unit_price,
-                od.quantity,
-                od.subtotal,
-                o.total_amount AS order_total,
-                c.phone
+            SELECT
+                (SELECT MIN(order_date)::date FROM orders),
+                (SELECT MAX(order_date)::date FROM orders),
+                MIN(quantity),
+                MAX(quantity),
+                MIN(subtotal),
+                MAX(subtotal),
+                COUNT(*)
+            FROM order_details
+        '''
+        return cached_query("order_details", query, fetch="one", snapshot=True)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil batas data order_details: {str(e)}")
+        return None
+
+@perf.timed("loader")
+def view_product_names():
+    """Ambil daftar nama produk untuk pilihan filter."""
+    try:
+        return [row[0] for row in cached_query(
+            "products", "SELECT DISTINCT name FROM products ORDER BY name ASC", snapshot=True
+        )]
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil nama produk: {str(e)}")
+        return []
+
+# ============================
+# Agregat dari materialized view (dibuat dan di-refresh oleh maintenance.py)
+# ============================
+@perf.timed("loader")
+def view_rollup(view_name):
+    """Ambil isi satu materialized view agregat sebagai DataFrame bertipe.
+
+    Mengembalikan None jika view belum dibuat atau gagal dibaca, sehingga halaman
+    bisa kembali menghitung agregat dari data baris.
+    """
+    try:
+        if view_name not in FRAME_SCHEMAS or not view_name.startswith("mv_"):
+            raise ValueError(f"Materialized view tidak dikenal: {view_name}")
+        return cached_frame("rollups", f"SELECT * FROM {view_name}", schema=view_name, snapshot=True)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil agregat {view_name}: {str(e)}")
+        return None
+
+# ============================
+# Rollup penjualan harian per produk (tabel sales_daily_product, diperbarui incremental oleh maintenance.py)
+# ============================
+# Nama rollup di tabel rollup_watermarks (sama dengan SALES_ROLLUP_TABLE di maintenance.py)
+_SALES_ROLLUP_NAME = "sales_daily_product"
+# Pengelompokan -> (kolom SELECT, kolom GROUP BY, skema hasil di FRAME_SCHEMAS)
+_SALES_ROLLUP_GROUPS = {
+    "product": ("p.name AS product_name, SUM(r.quantity) AS quantity, SUM(r.subtotal) AS subtotal, "
+                "SUM(r.jumlah_pesanan) AS jumlah_pesanan", "p.name", "mv_product_sales"),
+    "day": ("r.day, SUM(r.quantity) AS total_quantity, SUM(r.subtotal) AS total_revenue",
+            "r.day", "mv_daily_sales"),
+}
+
+def _sales_rollup_query(group_by, product_names=None, date_from=None, date_to=None):
+    """Query agregat rollup per produk atau per hari; hanya filter produk dan tanggal yang didukung.
+
+    Detail pesanan setelah watermark rollup (belum diproses maintenance.py) ikut dihitung langsung
+    dari order_details, sehingga hasilnya tidak tertinggal dari data baris meski job rollup terlambat.
+    Rollup dan watermark dibaca dalam satu query, jadi keduanya berasal dari snapshot yang sama.
+    """
+    select, group, _ = _SALES_ROLLUP_GROUPS[group_by]
+    where, params = _build_where([
+        ("p.name = ANY(%s)", list(product_names) if product_names else None),
+        ("r.day >= %s", date_from),
+        ("r.day <= %s", date_to),
+    ])
+    query = f'''
+        WITH r AS (
+            SELECT day, product_id, quantity, subtotal, jumlah_pesanan
+            FROM sales_daily_product
+            UNION ALL
+            SELECT o.order_date::date, od.product_id, od.quantity, od.subtotal, 1
             FROM order_details od
             JOIN orders o ON od.order_id = o.order_id
             JOIN customers c ON o.customer_id = c.customer_id
-            JOIN products p ON od.product_id = p.product_id
-            ORDER BY o.order_date DESC
+            WHERE od.order_detail_id > COALESCE(
+                (SELECT last_id FROM rollup_watermarks WHERE name = %s), 0
+            )
+        )
+        SELECT {select}
+        FROM r
+        JOIN products p ON r.product_id = p.product_id
+        {where}
+        GROUP BY {group}
+    '''
+    return query, [_SALES_ROLLUP_NAME] + params
+
+@perf.timed("loader")
+def view_sales_rollup(group_by, product_names=None, date_from=None, date_to=None):
+    """Penjualan per produk (group_by="product") atau per hari ("day") dari tabel rollup harian.
+
+    Hasilnya berskema sama dengan mv_product_sales / mv_daily_sales. Mengembalikan None jika tabel
+    rollup belum dibuat atau gagal dibaca, sehingga halaman bisa menghitung dari data baris.
+    Di-cache dengan TTL order_details karena ikut membaca detail pesanan terbaru.
+    """
+    try:
+        query, params = _sales_rollup_query(group_by, product_names, date_from, date_to)
+        return cached_frame("order_details", query, params, schema=_SALES_ROLLUP_GROUPS[group_by][2])
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil rollup penjualan per {group_by}: {str(e)}")
+        return None
+
+# ============================
+# Top-N + "Lainnya" untuk pie chart, dihitung di database
+# ============================
+# Jumlah irisan pie per produk; sisanya digabung menjadi satu irisan OTHERS_LABEL
+PIE_TOP_N = int(os.getenv("PIE_TOP_N", "10"))
+OTHERS_LABEL = "Lainnya"
+
+# Sumber top-N: nama -> (dataset cache, pembuat query, kolom label, kolom nilai).
+# Query baris dibuat tanpa ORDER BY: subquery yang diurutkan tidak di-flatten PostgreSQL,
+# sehingga semua baris hasil filter ikut diurutkan sebelum dikelompokkan
+_TOP_N_SOURCES = {
+    "products": ("products", partial(_products_query, ordered=False), "name", "stock"),
+    "order_details": ("order_details", partial(_order_details_query, ordered=False), "product_name", "quantity"),
+    "sales_rollup": ("order_details", partial(_sales_rollup_query, "product"), "product_name", "quantity"),
+}
+
+@perf.timed("loader")
+def view_top_n(source, top_n=PIE_TOP_N, **filters):
+    """Total nilai per label untuk top_n label terbesar, sisanya digabung menjadi satu baris "Lainnya".
+
+    Ukuran hasil paling banyak top_n + 1 baris, berapa pun jumlah produknya.
+    filters diteruskan ke pembuat query sumber. Mengembalikan DataFrame (label, value), atau None jika gagal.
+    """
+    try:
+        dataset, build_query, label, value = _TOP_N_SOURCES[source]
+        inner, params = build_query(**filters)
+        query = f'''
+            WITH totals AS (
+                SELECT "{label}" AS label, SUM("{value}") AS value
+                FROM ({inner}) AS t
+                GROUP BY "{label}"
+            ), ranked AS (
+                SELECT label, value, row_number() OVER (ORDER BY value DESC NULLS LAST, label) AS rank
+                FROM totals
+            )
+            SELECT
+                CASE WHEN rank <= %s THEN label ELSE %s END AS label,
+                SUM(value) AS value
+            FROM ranked
+            GROUP BY rank <= %s, 1
+            ORDER BY MIN(rank)
         '''
-        c.execute(query)
-        return c.fetchall()
+        return cached_frame(dataset, query, list(params) + [top_n, OTHERS_LABEL, top_n], schema="top_n")
     except Exception as e:
-        print(f"❌ ERROR saat mengambil data order_details: {str(e)}")
-        return []
+        print(f"❌ ERROR saat mengambil top-{top_n} {source}: {str(e)}")
+        return None
+
+# ============================
+# Export CSV streaming langsung dari PostgreSQL (COPY ... TO STDOUT)
+# ============================
+# Ukuran buffer tulis saat streaming export ke file (byte)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", str(1024 * 1024)))
+# Folder file export; file yang lebih tua dari EXPORT_TTL detik dihapus (session yang sudah
+# berakhir atau pindah halaman tidak menghapus file-nya sendiri)
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "dashboard_exports"))
+EXPORT_TTL = int(os.getenv("EXPORT_TTL", "3600"))
+# Jeda minimum antar pembersihan folder export (detik)
+_EXPORT_CLEANUP_INTERVAL = 60
+_last_export_cleanup = float("-inf")
+
+# Sumber data yang bisa di-export: pembuat query per dataset (kolom turunan dari _DERIVED_COLUMNS)
+_EXPORT_SOURCES = {
+    "customers": _customers_query,
+    "products": _products_query,
+    "orders": _orders_query,
+    "order_details": _order_details_query,
+}
+
+def cleanup_exports():
+    """Hapus file export yang lebih tua dari EXPORT_TTL; paling sering sekali per _EXPORT_CLEANUP_INTERVAL detik."""
+    global _last_export_cleanup
+    if time.monotonic() - _last_export_cleanup < _EXPORT_CLEANUP_INTERVAL:
+        return
+    _last_export_cleanup = time.monotonic()
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    expired_before = time.time() - EXPORT_TTL
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if name.startswith("export_") and os.path.getmtime(path) < expired_before:
+                os.remove(path)
+        except OSError:
+            pass  # Sudah dihapus session lain
+
+def export_csv(dataset, columns, compress=False, **filters):
+    """Stream hasil query dataset ke file CSV sementara lewat COPY ... TO STDOUT.
+
+    Baris ditulis bertahap ke disk (opsional di-gzip), sehingga hasil query tidak pernah
+    ditampung utuh di memori. Kolom harus berupa kolom hasil query atau kolom turunan di _DERIVED_COLUMNS.
+    File disimpan di EXPORT_DIR dan dihapus cleanup_exports() setelah EXPORT_TTL detik.
+    Mengembalikan path file, atau None jika gagal.
+    """
+    path = None
+    cleanup_exports()
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        query, params = _EXPORT_SOURCES[dataset](**filters)
+        derived = _DERIVED_COLUMNS[dataset]
+        select_list = sql.SQL(", ").join(
+            sql.SQL("{} AS {}").format(sql.SQL(derived[col]), sql.Identifier(col))
+            if col in derived else sql.Identifier(col)
+            for col in columns
+        )
+        suffix = ".csv.gz" if compress else ".csv"
+        # File sementara dengan buffer EXPORT_CHUNK_SIZE: baris dari COPY ditulis ke disk per potongan
+        with tempfile.NamedTemporaryFile(prefix=f"export_{dataset}_", suffix=suffix, dir=EXPORT_DIR,
+                                         delete=False, buffering=EXPORT_CHUNK_SIZE) as raw:
+            path = raw.name
+            def work(cur):
+                # Mulai dari file kosong: work diulang di primary jika replica gagal di tengah COPY
+                raw.seek(0)
+                raw.truncate()
+                if STATEMENT_TIMEOUTS["export"]:
+                    cur.execute(_with_timeout("", STATEMENT_TIMEOUTS["export"]))
+                inner = cur.mogrify(query, params).decode("utf-8")
+                copy_sql = sql.SQL("COPY (SELECT {} FROM ({}) AS t) TO STDOUT WITH (FORMAT csv, HEADER true)").format(
+                    select_list, sql.SQL(inner)
+                )
+                with _track_query(cur):
+                    if compress:
+                        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                            cur.copy_expert(copy_sql.as_string(cur), out)
+                    else:
+                        cur.copy_expert(copy_sql.as_string(cur), raw)
+                raw.flush()
+            with perf.stage(f"export:{dataset}", "export") as current:
+                run_read(work)
+                current.record(nbytes=os.path.getsize(path))
+        return path
+    except Exception as e:
+        print(f"❌ ERROR saat export data {dataset}: {str(e)}")
+        if path and os.path.exists(path):
+            os.remove(path)
+        return None
+
+# ============================
+# Ringkasan statistik untuk halaman Beranda
+# ============================
+@perf.timed("loader")
+def view_summary():
+    """Ambil total pelanggan, produk, pesanan, dan revenue dalam satu query agregat.
+
+    Mengembalikan tuple (total_customers, total_products, total_orders, total_revenue)
+    atau None jika gagal.
+    """
+    try:
+        query = '''
+            SELECT
+                (SELECT COUNT(*) FROM customers) AS total_customers,
+                (SELECT COUNT(*) FROM products) AS total_products,
+                (SELECT COUNT(*) FROM orders) AS total_orders,
+                (SELECT COALESCE(SUM(total_amount), 0) FROM orders) AS total_revenue
+        '''
+        return cached_query("summary", query, fetch="one", snapshot=True)
+    except Exception as e:
+        print(f"❌ ERROR saat mengambil ringkasan data: {str(e)}")
+        return None
+
+# ============================
+# Loader paralel: beberapa query independen sekaligus di koneksi pool yang berbeda
+# ============================
+# Jumlah thread loader bersama untuk semua session; default sama dengan ukuran pool
+LOADER_THREADS = int(os.getenv("LOADER_THREADS", str(DB_POOL_MAX)))
+
+_loader_executor = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix="loader")
+
+def load_parallel(**loaders):
+    """Jalankan beberapa loader (fungsi tanpa argumen, mis. functools.partial) secara paralel.
+
+    Setiap loader meminjam koneksinya sendiri dari pool, sehingga durasi total kira-kira sama dengan
+    loader paling lambat. Mengembalikan dict nama -> hasil setelah semua selesai; exception dari
+    loader diteruskan. Loader tidak boleh memanggil fungsi Streamlit atau load_parallel lagi.
+    Jika scope query rerun punya stop_check, penantian ini bisa dihentikan oleh rerun baru;
+    query loader yang masih berjalan lalu dibatalkan di server (lihat QueryScope).
+    """
+    # Setiap loader berjalan di salinan context pemanggil agar tahap perf tercatat di rerun yang sama
+    futures = {
+        name: _loader_executor.submit(contextvars.copy_context().run, loader)
+        for name, loader in loaders.items()
+    }
+    scope = _query_scope.get()
+    if scope is not None and scope.stop_check is not None:
+        pending = set(futures.values())
+        try:
+            while pending:
+                _, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL)
+                if pending:
+                    scope.stop_check()
+        except BaseException:
+            # Rerun digantikan (atau session berhenti): hasil loader tidak dipakai lagi,
+            # jadi loader yang belum mulai dibatalkan dan query yang sedang berjalan dihentikan
+            for future in pending:
+                future.cancel()
+            cancelled = scope.cancel()
+            if cancelled:
+                print(f"🛑 {cancelled} query dibatalkan karena rerun sudah digantikan")
+            raise
+    return {name: future.result() for name, future in futures.items()}
 
 # ============================
 # Fungsi untuk menutup koneksi (opsional, biasanya tidak perlu dipanggil)
 # ============================
 def close_connection():
-    """Fungsi untuk menutup koneksi database"""
-    global conn, c
-    try:
-        if c:
-            c.close()
-            print("✅ Cursor ditutup")
-        if conn:
-            conn.close()
-            print("✅ Koneksi database ditutup")
+    """Fungsi untuk menutup semua koneksi di pool database"""
+    global pool
+    try:
+        for replica in _replicas:
+            replica.close()
+        if pool:
+            pool.closeall()
+            pool = None
+            print("✅ Semua koneksi database di pool ditutup")
     except Exception as e:
         print(f"❌ ERROR saat menutup koneksi: {str(e)}")
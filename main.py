@@ -1,16 +1,29 @@
 # Import library
+import time
+
+# Waktu mulai script, untuk mengukur waktu startup/rerun (time-to-first-paint)
+_script_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
 import sys
 import os
+from functools import partial
+
+# Copy-on-Write: frame bersama dari config.py (FILTER_MODE=shared) dipakai semua session, dan turunannya
+# (seleksi kolom, assign, dll.) tidak boleh mengubah frame aslinya; salinan baru dibuat saat ditulis.
+# Diatur di entry point karena opsi ini berlaku untuk seluruh proses. Sudah bawaan sejak pandas 3.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # Add the current directory to path to import config
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Catat tahap-tahap (query, DataFrame, grafik) milik rerun ini untuk panel Performance
+import perf
+perf.start_run()
+
 # Import fungsi dari config.py
 try:
     from config import *
@@ -19,38 +32,186 @@ except Exception as e:
     st.info("💡 Pastikan file config.py ada dan database sudah terkoneksi")
     st.stop()
 
+# Scope query rerun ini: jika rerun baru menggantikannya (mis. slider masih digeser),
+# query loader yang masih berjalan dibatalkan di server
+try:
+    from streamlit.runtime.scriptrunner_utils.script_run_context import get_run_yield_check
+except ImportError:
+    get_run_yield_check = lambda: None  # Streamlit lama: hanya statement timeout, tanpa pembatalan
+start_query_scope(get_run_yield_check())
+
+# Durasi import library dan config.py (koneksi database dibuat lazy saat query pertama)
+_imports_done = time.perf_counter()
+
 # Set konfigurasi halaman dashboard
 st.set_page_config("Dashboard", page_icon="📊", layout="wide")  # Judul, ikon, tata letak lebar
 
-# Ambil data pelanggan dengan error handling
-@st.cache_data
-def load_customers():
-    try:
-        result = view_customers()
-        if not result:
-            st.warning("⚠️ Data pelanggan kosong")
-            return pd.DataFrame()
-        df = pd.DataFrame(result, columns=[
-            "customer_id", "name", "email", "phone", "address", "birthdate", 
-        ])
-        df['birthdate'] = pd.to_datetime(df['birthdate'])
-        df['Age'] = (datetime.now() - df['birthdate']).dt.days // 365
+# Tempat banner snapshot di atas halaman; diisi di akhir script setelah semua data dimuat
+snapshot_banner = st.empty()
+
+# Hapus file export kedaluwarsa milik session yang sudah berakhir (paling sering sekali per menit)
+cleanup_exports()
+
+# Callback tombol navigasi halaman tabel pelanggan
+def customers_prev_page():
+    st.session_state.customers_page = max(0, st.session_state.customers_page - 1)
+
+def customers_next_page():
+    st.session_state.customers_page += 1
+
+# Download deferred (Streamlit baru): isi file baru dibaca saat tombol Download diklik,
+# bukan di setiap rerun selama file export masih ada
+try:
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    DEFERRED_DOWNLOAD = hasattr(MediaFileManager, "add_deferred")
+except ImportError:
+    DEFERRED_DOWNLOAD = False
+
+def read_export(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Export CSV: file dibuat dengan streaming dari database hanya saat tombol "Siapkan" ditekan.
+# File disimpan per session dan dibuat ulang jika kolom atau filter berubah; file yang sudah
+# dihapus pembersihan berkala (EXPORT_TTL) disiapkan ulang.
+def render_csv_export(dataset, columns, label, file_name, **filters):
+    state_key = f"export_{dataset}"
+    compress = st.checkbox("🗜️ Kompres dengan gzip", key=f"{state_key}_gzip")
+    signature = repr((list(columns), sorted(filters.items()), compress))
+    
+    export = st.session_state.get(state_key)
+    if export and (export['signature'] != signature or not os.path.exists(export['path'])):
+        if os.path.exists(export['path']):
+            os.remove(export['path'])
+        del st.session_state[state_key]
+        export = None
+    
+    if export is None:
+        if st.button(f"📦 Siapkan {label}", key=f"{state_key}_prepare"):
+            with st.spinner("⏳ Menyiapkan file export..."):
+                path = export_csv(dataset, columns, compress=compress, **filters)
+            if path:
+                export = {'signature': signature, 'path': path}
+                st.session_state[state_key] = export
+            else:
+                st.error("❌ Gagal menyiapkan file export")
+    
+    if export:
+        download = dict(
+            label=f"⬇️ Download {label}",
+            file_name=file_name + ('.gz' if compress else ''),
+            mime='application/gzip' if compress else 'text/csv',
+            key=f"{state_key}_download"
+        )
+        if DEFERRED_DOWNLOAD:
+            st.download_button(data=partial(read_export, export['path']), **download)
+        else:
+            with open(export['path'], 'rb') as f:
+                st.download_button(data=f, **download)
+
+# Agregat grafik: pakai isi materialized view yang sudah dimuat (hanya dimuat jika tidak ada
+# filter baris yang aktif), selain itu (atau jika view belum tersedia) hitung dari data yang difilter.
+# Jika data halaman adalah sampel quick look (scale > 1), kolom jumlah/total diskalakan ke perkiraan
+def rollup_or_compute(rollup, compute, scale=1, totals=()):
+    if rollup is not None:
+        return rollup
+    result = compute()
+    return result.assign(**{col: result[col] * scale for col in totals}) if scale != 1 else result
+
+# Render grafik Plotly sebagai satu tahap performa, dengan jumlah titik data yang dikirim ke browser
+def plotly_chart(fig, name):
+    with perf.stage(f"chart:{name}", "chart") as current:
+        points = 0
+        for trace in fig.data:
+            values = next((getattr(trace, attr) for attr in ("x", "y", "values")
+                           if getattr(trace, attr, None) is not None), ())
+            points += len(values)
+        current.record(rows=points)
+        st.plotly_chart(fig, use_container_width=True)
+
+# Scatter plot besar: trace WebGL di atas SCATTER_WEBGL_THRESHOLD titik, dan data di-downsample
+# ke sekitar SCATTER_MAX_POINTS titik agar ukuran JSON yang dikirim ke browser tetap terbatas
+SCATTER_WEBGL_THRESHOLD = int(os.getenv("SCATTER_WEBGL_THRESHOLD", "5000"))
+SCATTER_MAX_POINTS = int(os.getenv("SCATTER_MAX_POINTS", "20000"))
+
+# Downsampling dengan density binning: satu titik per sel grid (x, y) per warna,
+# ditambah outlier sumbu y (di luar pagar 3×IQR) yang selalu dipertahankan
+def downsample_scatter(df, x, y, color=None, max_points=SCATTER_MAX_POINTS):
+    if len(df) <= max_points:
         return df
-    except Exception as e:
-        st.error(f"❌ Gagal memuat data pelanggan: {str(e)}")
-        return pd.DataFrame()
+    
+    x_values = df[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype('int64')
+    x_values = x_values.astype(float)
+    y_values = df[y].to_numpy(dtype=float)
+    
+    # Outlier paling jauh dari pagar, maksimal seperempat kuota titik
+    q1, q3 = np.nanpercentile(y_values, [25, 75])
+    fence = 3 * (q3 - q1)
+    distance = np.maximum(q1 - fence - y_values, y_values - (q3 + fence))
+    outliers = np.flatnonzero(distance > 0)
+    if len(outliers) > max_points // 4:
+        outliers = outliers[np.argsort(distance[outliers])[::-1][:max_points // 4]]
+    
+    # Sisa kuota dibagi rata ke grid bins × bins untuk setiap warna
+    groups = df[color].astype('category').cat.codes.to_numpy(dtype='int64') if color else np.zeros(len(df), dtype='int64')
+    bins = max(1, int(np.sqrt((max_points - len(outliers)) / (groups.max() + 1))))
+    
+    # Grid sumbu y hanya mencakup rentang di dalam pagar, agar outlier tidak memampatkan sel lain
+    def to_bin(values, low, high):
+        values = np.clip(np.nan_to_num(values, nan=low), low, high)
+        scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+        return np.minimum((scaled * bins).astype('int64'), bins - 1)
+    
+    y_low = max(np.nanmin(y_values), q1 - fence)
+    y_high = min(np.nanmax(y_values), q3 + fence)
+    cells = (
+        (groups * bins + to_bin(x_values, np.nanmin(x_values), np.nanmax(x_values))) * bins
+        + to_bin(y_values, y_low, y_high)
+    )
+    _, representatives = np.unique(cells, return_index=True)
+    return df.iloc[np.union1d(representatives, outliers)]
+
+# Siapkan data scatter: downsampling jika perlu, lalu pilih render_mode untuk px.scatter
+def prepare_scatter(df, x, y, color=None):
+    plot_df = downsample_scatter(df, x, y, color)
+    if len(plot_df) < len(df):
+        st.caption(f"ℹ️ Menampilkan {len(plot_df):,} dari {len(df):,} titik (downsampling, outlier tetap ditampilkan)")
+    render_mode = 'webgl' if len(plot_df) > SCATTER_WEBGL_THRESHOLD else 'svg'
+    return plot_df, render_mode
+
+# Data baris halaman. Quick look: sampel acak dengan filter yang sama (dari frame bersama pada
+# FILTER_MODE=shared, jadi tanpa query tambahan); metrik dan grafik dihitung dari sampel dengan jumlah/total
+# diskalakan ke perkiraan seluruh data. Sampel kosong (mis. tabel kecil atau filter sempit) -> data exact.
+# Mengembalikan (data, akhiran judul grafik, faktor skala jumlah/total)
+def page_rows(rows, quick_look, load_exact):
+    if not quick_look:
+        return rows, "", 1
+    if rows.empty:
+        return load_exact(), "", 1
+    st.caption(
+        f"⚡ Quick look aktif: metrik, grafik, dan tabel dihitung dari sampel acak ±{QUICK_LOOK_PERCENT:g}% "
+        f"({len(rows):,} baris); jumlah dan total adalah perkiraan (≈). Export CSV tetap exact."
+    )
+    return rows, f" (≈ sampel {QUICK_LOOK_PERCENT:g}%)", 100 / QUICK_LOOK_PERCENT
 
-df_customers = load_customers()
+# Nilai metrik, diberi tanda ≈ jika dihitung dari sampel quick look
+def metric_value(value, approx):
+    return f"≈ {value}" if approx else value
 
 # Fungsi tampilkan tabel + export CSV
+@perf.timed("page")
 def tabelCustomers_dan_export():
     try:
-        # Hitung jumlah pelanggan
-        total_customers = df_customers.shape[0]
+        # Ambil batas usia dan jumlah pelanggan tanpa menarik seluruh tabel
+        bounds_customers = view_customers_bounds()
         
-        if total_customers == 0:
+        if not bounds_customers or not bounds_customers[2]:
             st.warning("⚠️ Data pelanggan kosong. Belum ada pelanggan di database.")
             return
+        
+        min_age, max_age, total_customers = bounds_customers
 
         # Tampilkan metrik
         col1, col2, col3 = st.columns(3) # Fungsi st.columns(3) membuat tiga kolom sejajar di tampilan web Streamlit, menjadi tiga bagian horizontal — col1, col2, dan col3.
@@ -60,8 +221,8 @@ def tabelCustomers_dan_export():
         # Sidebar: Filter Rentang Usia
         with st.sidebar.expander("🔍 Filter Data Pelanggan", expanded=True):
             st.markdown("**Filter Rentang Usia**")
-            min_age = int(df_customers['Age'].min())
-            max_age = int(df_customers['Age'].max())
+            min_age = min_age or 0
+            max_age = max_age or 0
             # Pastikan max_value > min_value
             if max_age <= min_age:
                 max_age = min_age + 1
@@ -72,38 +233,77 @@ def tabelCustomers_dan_export():
                 value=(min_age, max_age),
                 help="Geser untuk memilih rentang usia yang ingin ditampilkan"
             )
+            
+            st.markdown("---")
+            page_size = st.selectbox(
+                "Jumlah Baris per Halaman",
+                options=[25, 50, 100, 250, 500],
+                index=1,
+                help="Hanya satu halaman yang diambil dari database setiap kali halaman dimuat"
+            )
 
-        # Terapkan filter usia
-        filtered_df = df_customers[df_customers['Age'].between(*age_range)]
+        # Terapkan filter usia di database
+        filtered_total = count_customers(min_age=age_range[0], max_age=age_range[1])
+        total_pages = max(1, -(-filtered_total // page_size))
+        
+        # Keyset pagination: simpan (name, customer_id) terakhir dari tiap halaman.
+        # Kursor di-reset jika filter atau ukuran halaman berubah.
+        page_signature = (age_range, page_size)
+        if st.session_state.get('customers_page_signature') != page_signature:
+            st.session_state.customers_page_signature = page_signature
+            st.session_state.customers_page = 0
+            st.session_state.customers_cursors = [None]
+        page_index = min(st.session_state.customers_page, total_pages - 1, len(st.session_state.customers_cursors) - 1)
+        st.session_state.customers_page = page_index
+        
+        page_df = view_customers_page(
+            page_size=page_size,
+            after=st.session_state.customers_cursors[page_index],
+            min_age=age_range[0],
+            max_age=age_range[1]
+        )
+        
+        # Simpan kursor untuk halaman berikutnya
+        if len(page_df) == page_size:
+            last_row = page_df.iloc[-1]
+            next_cursor = (last_row['name'], int(last_row['customer_id']))
+            if len(st.session_state.customers_cursors) == page_index + 1:
+                st.session_state.customers_cursors.append(next_cursor)
+            else:
+                st.session_state.customers_cursors[page_index + 1] = next_cursor
+        
+        with col2:
+            st.metric(label="🔍 Pelanggan Sesuai Filter", value=filtered_total)
 
         # Tampilkan tabel pelanggan
         st.markdown("### 📋 Tabel Data Pelanggan")
         
-        showdata = st.multiselect( # menampilkan daftar kolom dari filtered_df yang bisa dipilih pengguna.
+        showdata = st.multiselect( # menampilkan daftar kolom dari page_df yang bisa dipilih pengguna.
             "Pilih Kolom Pelanggan yang Ditampilkan",
-            options=filtered_df.columns, # menampilkan semua nama kolom yang tersedia.
+            options=page_df.columns, # menampilkan semua nama kolom yang tersedia.
             default=["customer_id", "name", "email", "phone", "address", "birthdate", "Age"]
         )
         
         # Menampilkan tabel data pelanggan ke layar dengan hanya kolom yang dipilih (showdata).
         # use_container_width=True membuat tabel otomatis menyesuaikan lebar layar (responsif).
-        st.dataframe(filtered_df[showdata], use_container_width=True) 
-
-        # Mendefinisikan fungsi helper untuk mengubah DataFrame menjadi file CSV.
-        # @st.cache_data adalah decorator Streamlit agar fungsi ini tidak dijalankan ulang setiap kali halaman di-refresh
-        # _df.to_csv(index=False) mengubah DataFrame menjadi teks CSV tanpa kolom indeks.
-        # membuat hasilnya bisa diunduh dengan karakter yang benar
-
-        @st.cache_data
-        def convert_df_to_csv(_df):
-            return _df.to_csv(index=False).encode('utf-8')
+        st.dataframe(page_df[showdata], use_container_width=True) 
         
-        csv = convert_df_to_csv(filtered_df[showdata])
-        st.download_button(
-            label="⬇️ Download Data Pelanggan sebagai CSV",
-            data=csv,
+        # Navigasi halaman
+        nav1, nav2, nav3 = st.columns([1, 2, 1])
+        with nav1:
+            st.button("⬅️ Sebelumnya", on_click=customers_prev_page, disabled=page_index == 0)
+        with nav2:
+            st.markdown(f"Halaman **{page_index + 1}** dari **{total_pages}**")
+        with nav3:
+            st.button("Berikutnya ➡️", on_click=customers_next_page, disabled=page_index + 1 >= total_pages)
+
+        # Export seluruh pelanggan yang sesuai filter (bukan hanya halaman ini) langsung dari database
+        render_csv_export(
+            "customers", showdata,
+            label="Data Pelanggan sebagai CSV",
             file_name='data_pelanggan.csv',
-            mime='text/csv'
+            min_age=age_range[0],
+            max_age=age_range[1]
         )
     
     except Exception as e:
@@ -112,22 +312,18 @@ def tabelCustomers_dan_export():
 # ============================================
 # FUNGSI VISUALISASI PRODUCTS
 # ============================================
+@perf.timed("page")
 def visualisasiProducts():
+    # Plotly hanya di-import saat halaman grafik dibuka, bukan saat startup
+    import plotly.express as px
+
     try:
-        # Ambil data products
-        result_products = view_products()
+        # Ambil data products (sudah bertipe numerik dari config.py)
+        df_products = view_products()
         
-        if not result_products:
+        if df_products.empty:
             st.warning("⚠️ Data produk kosong. Belum ada produk di database.")
             return
-            
-        df_products = pd.DataFrame(result_products, columns=[
-            "product_id", "name", "description", "price", "stock"
-        ])
-        
-        # Konversi ke numeric
-        df_products['price'] = pd.to_numeric(df_products['price'], errors='coerce')
-        df_products['stock'] = pd.to_numeric(df_products['stock'], errors='coerce')
         
         # Filter di sidebar
         with st.sidebar.expander("🔍 Filter Data Produk", expanded=True):
@@ -241,31 +437,44 @@ def visualisasiProducts():
                     color_continuous_scale='Blues'
                 )
                 fig_price.update_xaxes(tickangle=-45)
-                st.plotly_chart(fig_price, use_container_width=True)
+                plotly_chart(fig_price, "price")
             
             with col2:
-                # Pie chart distribusi stok (menggunakan data filtered)
-                fig_stock = px.pie(
-                    filtered_products,
-                    values='stock',
-                    names='name',
-                    title='Distribusi Stok Produk',
-                    hole=0.4
+                # Pie chart distribusi stok: top-N produk + "Lainnya", dihitung di database dengan filter yang sama
+                stock_share = view_top_n(
+                    "products",
+                    min_price=price_range[0],
+                    max_price=price_range[1],
+                    min_stock=stock_range[0],
+                    max_stock=stock_range[1]
                 )
-                st.plotly_chart(fig_stock, use_container_width=True)
+                if stock_share is None:
+                    st.warning("⚠️ Distribusi stok tidak tersedia.")
+                else:
+                    fig_stock = px.pie(
+                        stock_share,
+                        values='value',
+                        names='label',
+                        title=f'Distribusi Stok Produk (Top {PIE_TOP_N})',
+                        labels={'label': 'Nama Produk', 'value': 'Stok'},
+                        hole=0.4
+                    )
+                    plotly_chart(fig_stock, "stock")
             
             # Scatter plot harga vs stok (menggunakan data filtered)
+            scatter_products, render_mode = prepare_scatter(filtered_products, 'price', 'stock')
             fig_scatter = px.scatter(
-                filtered_products,
+                scatter_products,
                 x='price',
                 y='stock',
-                size=np.array(filtered_products['stock'], dtype=float),
+                size=np.array(scatter_products['stock'], dtype=float),
                 color='price',
                 hover_name='name',
                 title='Hubungan Harga vs Stok Produk',
-                labels={'price': 'Harga (Rp)', 'stock': 'Stok'}
+                labels={'price': 'Harga (Rp)', 'stock': 'Stok'},
+                render_mode=render_mode
             )
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            plotly_chart(fig_scatter, "scatter")
         
         with tab2:
             st.markdown("### 📋 Tabel Data Produk")
@@ -294,16 +503,14 @@ def visualisasiProducts():
                 st.info(f"💡 Produk dengan status '⚠️ Rendah' memiliki stok di bawah {threshold_stok_rendah} unit")
             
             # Export CSV
-            @st.cache_data
-            def convert_df_to_csv(_df):
-                return _df.to_csv(index=False).encode('utf-8')
-            
-            csv = convert_df_to_csv(filtered_products[showdata_products])
-            st.download_button(
-                label="⬇️ Download Data Produk sebagai CSV",
-                data=csv,
+            render_csv_export(
+                "products", showdata_products,
+                label="Data Produk sebagai CSV",
                 file_name='data_produk.csv',
-                mime='text/csv'
+                min_price=price_range[0],
+                max_price=price_range[1],
+                min_stock=stock_range[0],
+                max_stock=stock_range[1]
             )
         
         with tab3:
@@ -315,7 +522,7 @@ def visualisasiProducts():
                 title='Distribusi Harga Produk',
                 labels={'price': 'Harga (Rp)', 'count': 'Jumlah Produk'}
             )
-            st.plotly_chart(fig_hist, use_container_width=True)
+            plotly_chart(fig_hist, "hist")
             
             # Box plot harga (menggunakan data filtered)
             fig_box = px.box(
@@ -324,7 +531,7 @@ def visualisasiProducts():
                 title='Box Plot Harga Produk',
                 labels={'price': 'Harga (Rp)'}
             )
-            st.plotly_chart(fig_box, use_container_width=True)
+            plotly_chart(fig_box, "box")
         
         with tab4:
             col1, col2 = st.columns(2)
@@ -342,7 +549,7 @@ def visualisasiProducts():
                     color_continuous_scale='Reds'
                 )
                 fig_low_stock.update_layout(yaxis={'categoryorder': 'total ascending'})
-                st.plotly_chart(fig_low_stock, use_container_width=True)
+                plotly_chart(fig_low_stock, "low_stock")
             
             with col2:
                 # Bar chart produk stok rendah (berdasarkan threshold) - Horizontal
@@ -365,7 +572,7 @@ def visualisasiProducts():
                         annotation_text=f"Threshold: {threshold_stok_rendah}",
                         annotation_position="top"
                     )
-                    st.plotly_chart(fig_stok_rendah, use_container_width=True)
+                    plotly_chart(fig_stok_rendah, "stok_rendah")
                 else:
                     st.success(f"✅ Tidak ada produk dengan stok rendah (semua produk memiliki stok ≥ {threshold_stok_rendah} unit)")
             
@@ -383,42 +590,36 @@ def visualisasiProducts():
 # ============================================
 # FUNGSI VISUALISASI ORDERS
 # ============================================
+@perf.timed("page")
 def visualisasiOrders():
+    # Plotly hanya di-import saat halaman grafik dibuka, bukan saat startup
+    import plotly.express as px
+
     try:
-        # Ambil data orders
-        result_orders = view_orders_with_customers()
+        # Ambil batas filter (MIN/MAX) tanpa menarik seluruh data orders
+        bounds_orders = view_orders_bounds()
         
-        if not result_orders:
+        if not bounds_orders or not bounds_orders[4]:
             st.warning("⚠️ Data pesanan kosong. Belum ada pesanan di database.")
             return
-            
-        df_orders = pd.DataFrame(result_orders, columns=[
-            "order_id", "order_date", "total_amount", "customer_name", "phone"
-        ])
-        
-        # Konversi order_date ke datetime
-        df_orders['order_date'] = pd.to_datetime(df_orders['order_date'])
-        df_orders['month'] = df_orders['order_date'].dt.to_period('M').astype(str)
-        df_orders['day'] = df_orders['order_date'].dt.date
         
-        # Konversi total_amount ke numeric
-        df_orders['total_amount'] = pd.to_numeric(df_orders['total_amount'], errors='coerce')
+        min_day, max_day, min_amount, max_amount, total_orders = bounds_orders
         
         # Filter di sidebar
         with st.sidebar.expander("🔍 Filter Data Pesanan", expanded=True):
             st.markdown("**Filter Rentang Tanggal**")
             date_range = st.date_input(
                 "Pilih Rentang Tanggal",
-                value=(df_orders['day'].min(), df_orders['day'].max()),
-                min_value=df_orders['day'].min(),
-                max_value=df_orders['day'].max(),
+                value=(min_day, max_day),
+                min_value=min_day,
+                max_value=max_day,
                 help="Pilih tanggal mulai dan akhir untuk memfilter data pesanan"
             )
             
             st.markdown("---")
             st.markdown("**Filter Rentang Total Amount**")
-            min_amount = float(df_orders['total_amount'].min())
-            max_amount = float(df_orders['total_amount'].max())
+            min_amount = float(min_amount)
+            max_amount = float(max_amount)
             # Pastikan max_value > min_value
             if max_amount <= min_amount:
                 max_amount = min_amount + 1000.0
@@ -432,36 +633,49 @@ def visualisasiOrders():
                 help="Geser untuk memilih rentang total amount yang ingin ditampilkan"
             )
         
-        # Terapkan filter
-        filtered_orders = df_orders.copy()
-        
-        # Filter tanggal
-        if len(date_range) == 2:
-            filtered_orders = filtered_orders[
-                (filtered_orders['day'] >= date_range[0]) & 
-                (filtered_orders['day'] <= date_range[1])
-            ]
-        
-        # Filter total amount
-        filtered_orders = filtered_orders[
-            (filtered_orders['total_amount'] >= amount_range[0]) & 
-            (filtered_orders['total_amount'] <= amount_range[1])
-        ]
+        # Terapkan filter di database: hanya baris yang cocok yang diambil
+        date_from, date_to = date_range if len(date_range) == 2 else (None, None)
         
-        # Metrik (menggunakan data yang sudah difilter)
+        # Filter baris dianggap tidak aktif jika rentang tanggal dan amount masih penuh
+        no_row_filter = (
+            (date_from is None or date_from <= min_day) and (date_to is None or date_to >= max_day)
+            and amount_range[0] <= min_amount and amount_range[1] >= max_amount
+        )
+        
+        # Data filtered (sampel saat quick look) dan agregat materialized view (jika tanpa filter dan
+        # quick look tidak aktif) dimuat paralel. Kolom month/day dan dtype numerik/datetime sudah disiapkan oleh config.py
+        quick_look = st.session_state.get("quick_look")
+        rollup_names = ["mv_monthly_revenue", "mv_daily_revenue", "mv_customer_totals"] if no_row_filter and not quick_look else []
+        order_filters = dict(
+            date_from=date_from,
+            date_to=date_to,
+            min_amount=amount_range[0],
+            max_amount=amount_range[1]
+        )
+        loaded = load_parallel(
+            filtered_orders=(partial(view_sample, "orders", **order_filters) if quick_look
+                             else partial(view_orders_filtered, **order_filters)),
+            **{name: partial(view_rollup, name) for name in rollup_names}
+        )
+        filtered_orders, approx, scale = page_rows(
+            loaded["filtered_orders"], quick_look, partial(view_orders_filtered, **order_filters)
+        )
+        order_count = round(len(filtered_orders) * scale)
+        
+        # Metrik (menggunakan data yang sudah difilter; perkiraan dari sampel saat quick look)
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("📦 Total Pesanan", filtered_orders.shape[0])
+            st.metric("📦 Total Pesanan", metric_value(order_count, approx))
         with col2:
-            st.metric("💰 Total Pendapatan", f"Rp {filtered_orders['total_amount'].sum():,.0f}")
+            st.metric("💰 Total Pendapatan", metric_value(f"Rp {filtered_orders['total_amount'].sum() * scale:,.0f}", approx))
         with col3:
-            st.metric("📊 Rata-rata Pesanan", f"Rp {filtered_orders['total_amount'].mean():,.0f}")
+            st.metric("📊 Rata-rata Pesanan", metric_value(f"Rp {filtered_orders['total_amount'].mean():,.0f}", approx))
         with col4:
-            st.metric("📈 Pesanan Tertinggi", f"Rp {filtered_orders['total_amount'].max():,.0f}")
+            st.metric("📈 Pesanan Tertinggi", metric_value(f"Rp {filtered_orders['total_amount'].max():,.0f}", approx))
         
         # Info filter aktif
-        if len(filtered_orders) < len(df_orders):
-            st.info(f"📊 Menampilkan {len(filtered_orders)} dari {len(df_orders)} pesanan berdasarkan filter yang dipilih")
+        if order_count < total_orders:
+            st.info(f"📊 Menampilkan {metric_value(order_count, approx)} dari {total_orders} pesanan berdasarkan filter yang dipilih")
         
         st.markdown("---")
         
@@ -469,48 +683,59 @@ def visualisasiOrders():
         tab1, tab2, tab3, tab4 = st.tabs(["📊 Grafik", "📋 Tabel", "📈 Trend Waktu", "👥 Analisis Pelanggan"])
         
         with tab1:
+            # Statistik per bulan (materialized view jika tanpa filter, selain itu data filtered atau sampel quick look)
+            monthly_stats = rollup_or_compute(
+                loaded.get("mv_monthly_revenue"),
+                lambda: filtered_orders.groupby('month').agg(
+                    total_amount=('total_amount', 'sum'),
+                    jumlah_pesanan=('order_id', 'count')
+                ).reset_index(),
+                scale, totals=['total_amount', 'jumlah_pesanan']
+            ).sort_values('month')
+            
             col1, col2 = st.columns(2)
             
             with col1:
-                # Line chart pendapatan per bulan (menggunakan data filtered)
-                monthly_revenue = filtered_orders.groupby('month')['total_amount'].sum().reset_index()
+                # Line chart pendapatan per bulan
+                monthly_revenue = monthly_stats[['month', 'total_amount']]
                 fig_monthly = px.line(
                     monthly_revenue,
                     x='month',
                     y='total_amount',
-                    title='Pendapatan per Bulan',
+                    title=f'Pendapatan per Bulan{approx}',
                     labels={'month': 'Bulan', 'total_amount': 'Pendapatan (Rp)'},
                     markers=True
                 )
-                st.plotly_chart(fig_monthly, use_container_width=True)
+                plotly_chart(fig_monthly, "monthly")
             
             with col2:
-                # Bar chart jumlah pesanan per bulan (menggunakan data filtered)
-                monthly_orders = filtered_orders.groupby('month')['order_id'].count().reset_index()
-                monthly_orders.columns = ['month', 'jumlah_pesanan']
+                # Bar chart jumlah pesanan per bulan
+                monthly_orders = monthly_stats[['month', 'jumlah_pesanan']]
                 fig_orders = px.bar(
                     monthly_orders,
                     x='month',
                     y='jumlah_pesanan',
-                    title='Jumlah Pesanan per Bulan',
+                    title=f'Jumlah Pesanan per Bulan{approx}',
                     labels={'month': 'Bulan', 'jumlah_pesanan': 'Jumlah Pesanan'},
                     color='jumlah_pesanan',
                     color_continuous_scale='Greens'
                 )
-                st.plotly_chart(fig_orders, use_container_width=True)
+                plotly_chart(fig_orders, "orders")
             
-            # Scatter plot order date vs total amount (menggunakan data filtered)
+            # Scatter plot order date vs total amount (menggunakan data filtered atau sampel quick look)
+            scatter_orders, render_mode = prepare_scatter(filtered_orders, 'order_date', 'total_amount')
             fig_scatter = px.scatter(
-                filtered_orders,
+                scatter_orders,
                 x='order_date',
                 y='total_amount',
-                size=np.array(filtered_orders['total_amount'], dtype=float),
+                size=np.array(scatter_orders['total_amount'], dtype=float),
                 color='total_amount',
                 hover_name='customer_name',
-                title='Pesanan Berdasarkan Tanggal dan Jumlah',
-                labels={'order_date': 'Tanggal Pesanan', 'total_amount': 'Total (Rp)'}
+                title=f'Pesanan Berdasarkan Tanggal dan Jumlah{approx}',
+                labels={'order_date': 'Tanggal Pesanan', 'total_amount': 'Total (Rp)'},
+                render_mode=render_mode
             )
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            plotly_chart(fig_scatter, "scatter")
         
         with tab2:
             st.markdown("### 📋 Tabel Data Pesanan")
@@ -523,51 +748,56 @@ def visualisasiOrders():
             st.dataframe(filtered_orders[showdata_orders], use_container_width=True)
             
             # Export CSV
-            @st.cache_data
-            def convert_df_to_csv(_df):
-                return _df.to_csv(index=False).encode('utf-8')
-            
-            csv = convert_df_to_csv(filtered_orders[showdata_orders])
-            st.download_button(
-                label="⬇️ Download Data Pesanan sebagai CSV",
-                data=csv,
+            render_csv_export(
+                "orders", showdata_orders,
+                label="Data Pesanan sebagai CSV",
                 file_name='data_pesanan.csv',
-                mime='text/csv'
+                date_from=date_from,
+                date_to=date_to,
+                min_amount=amount_range[0],
+                max_amount=amount_range[1]
             )
         
         with tab3:
-            # Line chart trend harian (menggunakan data filtered)
-            daily_revenue = filtered_orders.groupby('day')['total_amount'].sum().reset_index()
+            # Line chart trend harian (materialized view jika tanpa filter, selain itu data filtered atau sampel quick look)
+            daily_revenue = rollup_or_compute(
+                loaded.get("mv_daily_revenue"),
+                lambda: filtered_orders.groupby('day')['total_amount'].sum().reset_index(),
+                scale, totals=['total_amount']
+            ).sort_values('day')
             fig_daily = px.line(
                 daily_revenue,
                 x='day',
                 y='total_amount',
-                title='Trend Pendapatan Harian',
+                title=f'Trend Pendapatan Harian{approx}',
                 labels={'day': 'Tanggal', 'total_amount': 'Pendapatan (Rp)'},
                 markers=True
             )
-            st.plotly_chart(fig_daily, use_container_width=True)
+            plotly_chart(fig_daily, "daily")
         
         with tab4:
-            # Top 10 pelanggan berdasarkan total pembelian (menggunakan data filtered)
-            customer_stats = filtered_orders.groupby('customer_name').agg({
-                'order_id': 'count',
-                'total_amount': 'sum'
-            }).reset_index()
-            customer_stats.columns = ['customer_name', 'jumlah_pesanan', 'total_pembelian']
+            # Top 10 pelanggan berdasarkan total pembelian (materialized view jika tanpa filter, selain itu data filtered atau sampel quick look)
+            customer_stats = rollup_or_compute(
+                loaded.get("mv_customer_totals"),
+                lambda: filtered_orders.groupby('customer_name').agg(
+                    jumlah_pesanan=('order_id', 'count'),
+                    total_pembelian=('total_amount', 'sum')
+                ).reset_index(),
+                scale, totals=['jumlah_pesanan', 'total_pembelian']
+            )
             customer_stats = customer_stats.sort_values('total_pembelian', ascending=False).head(10)
             
             fig_customers = px.bar(
                 customer_stats,
                 x='customer_name',
                 y='total_pembelian',
-                title='Top 10 Pelanggan Berdasarkan Total Pembelian',
+                title=f'Top 10 Pelanggan Berdasarkan Total Pembelian{approx}',
                 labels={'customer_name': 'Nama Pelanggan', 'total_pembelian': 'Total Pembelian (Rp)'},
                 color='total_pembelian',
                 color_continuous_scale='Purples'
             )
             fig_customers.update_xaxes(tickangle=-45)
-            st.plotly_chart(fig_customers, use_container_width=True)
+            plotly_chart(fig_customers, "customers")
     
     except Exception as e:
         st.error(f"❌ Gagal memuat data pesanan: {str(e)}")
@@ -575,36 +805,28 @@ def visualisasiOrders():
 # ============================================
 # FUNGSI VISUALISASI ORDER DETAILS
 # ============================================
+@perf.timed("page")
 def visualisasiOrderDetails():
+    # Plotly hanya di-import saat halaman grafik dibuka, bukan saat startup
+    import plotly.express as px
+
     try:
-        # Ambil data order details
-        result_order_details = view_order_details_with_info()
+        # Ambil batas filter (MIN/MAX) dan daftar nama produk secara paralel, tanpa menarik seluruh detail pesanan
+        loaded = load_parallel(bounds=view_order_details_bounds, product_names=view_product_names)
+        bounds_details = loaded["bounds"]
         
-        if not result_order_details:
+        if not bounds_details or not bounds_details[6]:
             st.warning("⚠️ Data detail pesanan kosong.")
             return
-            
-        df_order_details = pd.DataFrame(result_order_details, columns=[
-            "order_detail_id", "order_id", "order_date", "customer_id", "customer_name",
-            "product_id", "product_name", "unit_price", "quantity", "subtotal",
-            "order_total", "phone"
-        ])
-        
-        # Konversi order_date ke datetime
-        df_order_details['order_date'] = pd.to_datetime(df_order_details['order_date'])
-        df_order_details['day'] = df_order_details['order_date'].dt.date
         
-        # Konversi kolom numeric
-        df_order_details['subtotal'] = pd.to_numeric(df_order_details['subtotal'], errors='coerce')
-        df_order_details['quantity'] = pd.to_numeric(df_order_details['quantity'], errors='coerce')
-        df_order_details['unit_price'] = pd.to_numeric(df_order_details['unit_price'], errors='coerce')
+        min_day, max_day, min_qty, max_qty, min_subtotal, max_subtotal, total_details = bounds_details
         
         # Filter di sidebar
         with st.sidebar.expander("🔍 Filter Data Detail Pesanan", expanded=True):
             st.markdown("**Filter berdasarkan Produk**")
             product_filter = st.multiselect(
                 "Pilih Produk",
-                options=sorted(df_order_details['product_name'].unique()),
+                options=loaded["product_names"],
                 default=[],
                 help="Pilih satu atau lebih produk untuk memfilter data"
             )
@@ -613,16 +835,16 @@ def visualisasiOrderDetails():
             st.markdown("**Filter Rentang Tanggal**")
             date_range = st.date_input(
                 "Pilih Rentang Tanggal",
-                value=(df_order_details['day'].min(), df_order_details['day'].max()),
-                min_value=df_order_details['day'].min(),
-                max_value=df_order_details['day'].max(),
+                value=(min_day, max_day),
+                min_value=min_day,
+                max_value=max_day,
                 help="Pilih tanggal mulai dan akhir untuk memfilter data"
             )
             
             st.markdown("---")
             st.markdown("**Filter Rentang Quantity**")
-            min_qty = int(df_order_details['quantity'].min())
-            max_qty = int(df_order_details['quantity'].max())
+            min_qty = int(min_qty)
+            max_qty = int(max_qty)
             # Pastikan max_value > min_value
             if max_qty <= min_qty:
                 max_qty = min_qty + 1
@@ -636,8 +858,8 @@ def visualisasiOrderDetails():
             
             st.markdown("---")
             st.markdown("**Filter Rentang Subtotal**")
-            min_subtotal = float(df_order_details['subtotal'].min())
-            max_subtotal = float(df_order_details['subtotal'].max())
+            min_subtotal = float(min_subtotal)
+            max_subtotal = float(max_subtotal)
             # Pastikan max_value > min_value
             if max_subtotal <= min_subtotal:
                 max_subtotal = min_subtotal + 1000.0
@@ -651,46 +873,74 @@ def visualisasiOrderDetails():
                 help="Geser untuk memilih rentang subtotal yang ingin ditampilkan"
             )
         
-        # Terapkan filter
-        filtered_details = df_order_details.copy()
-        
-        # Filter produk
-        if product_filter:
-            filtered_details = filtered_details[filtered_details['product_name'].isin(product_filter)]
-        
-        # Filter tanggal
-        if len(date_range) == 2:
-            filtered_details = filtered_details[
-                (filtered_details['day'] >= date_range[0]) & 
-                (filtered_details['day'] <= date_range[1])
-            ]
-        
-        # Filter quantity
-        filtered_details = filtered_details[
-            (filtered_details['quantity'] >= qty_range[0]) & 
-            (filtered_details['quantity'] <= qty_range[1])
-        ]
+        # Terapkan filter di database: hanya baris yang cocok yang diambil
+        date_from, date_to = date_range if len(date_range) == 2 else (None, None)
+        detail_filters = dict(
+            product_names=product_filter,
+            date_from=date_from,
+            date_to=date_to,
+            min_qty=qty_range[0],
+            max_qty=qty_range[1],
+            min_subtotal=subtotal_range[0],
+            max_subtotal=subtotal_range[1]
+        )
         
-        # Filter subtotal
-        filtered_details = filtered_details[
-            (filtered_details['subtotal'] >= subtotal_range[0]) & 
-            (filtered_details['subtotal'] <= subtotal_range[1])
-        ]
+        # Jika hanya filter produk dan tanggal yang aktif (quantity dan subtotal masih penuh),
+        # tab Produk Terlaris dan Analisis Penjualan dijawab dari rollup harian per produk
+        rollup_filters_only = (
+            qty_range[0] <= min_qty and qty_range[1] >= max_qty
+            and subtotal_range[0] <= min_subtotal and subtotal_range[1] >= max_subtotal
+        )
+        rollup_filters = dict(product_names=product_filter, date_from=date_from, date_to=date_to)
         
-        # Metrik (menggunakan data yang sudah difilter)
+        # Data filtered (sampel saat quick look), top-N pie, tabel dimensi produk, dan agregat rollup
+        # (jika filternya didukung) dimuat paralel. Quick look tidak menjalankan query agregat: pie dan
+        # agregat dihitung dari sampel. Kolom day dan dtype numerik/datetime sudah disiapkan oleh config.py
+        quick_look = st.session_state.get("quick_look")
+        rollup_groups = ["product", "day"] if rollup_filters_only and not quick_look else []
+        loaded = load_parallel(
+            filtered_details=(partial(view_sample, "order_details", **detail_filters) if quick_look
+                              else partial(view_order_details_filtered, **detail_filters)),
+            **({} if quick_look else {
+                'sales_share': (partial(view_top_n, "sales_rollup", **rollup_filters) if rollup_filters_only
+                                else partial(view_top_n, "order_details", **detail_filters))
+            }),
+            **({'products': view_products} if DETAIL_FETCH_MODE == "star" else {}),
+            **{f"sales_by_{group}": partial(view_sales_rollup, group, **rollup_filters) for group in rollup_groups}
+        )
+        filtered_details, approx, scale = page_rows(
+            loaded["filtered_details"], quick_look, partial(view_order_details_filtered, **detail_filters)
+        )
+        detail_count = round(len(filtered_details) * scale)
+        
+        # Nama produk digabung dari tabel dimensi produk (mode fetch "star"), hanya kolom yang dipakai grafik
+        details_by_product = join_dimensions(filtered_details, ['product_name'])
+        
+        # Penjualan per produk (rollup jika filternya didukung, selain itu data filtered atau sampel quick look)
+        product_sales = rollup_or_compute(
+            loaded.get("sales_by_product"),
+            lambda: details_by_product.groupby('product_name', observed=True).agg(
+                quantity=('quantity', 'sum'),
+                subtotal=('subtotal', 'sum'),
+                jumlah_pesanan=('order_id', 'count')
+            ).reset_index(),
+            scale, totals=['quantity', 'subtotal', 'jumlah_pesanan']
+        )
+        
+        # Metrik (menggunakan data yang sudah difilter; perkiraan dari sampel saat quick look)
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("📦 Total Item Terjual", int(filtered_details['quantity'].sum()))
+            st.metric("📦 Total Item Terjual", metric_value(round(filtered_details['quantity'].sum() * scale), approx))
         with col2:
-            st.metric("💰 Total Revenue", f"Rp {filtered_details['subtotal'].sum():,.0f}")
+            st.metric("💰 Total Revenue", metric_value(f"Rp {filtered_details['subtotal'].sum() * scale:,.0f}", approx))
         with col3:
-            st.metric("📊 Rata-rata Quantity", f"{filtered_details['quantity'].mean():.2f}")
+            st.metric("📊 Rata-rata Quantity", metric_value(f"{filtered_details['quantity'].mean():.2f}", approx))
         with col4:
-            st.metric("🛍️ Produk Unik Terjual", filtered_details['product_name'].nunique())
+            st.metric("🛍️ Produk Unik Terjual", metric_value(details_by_product['product_name'].nunique(), approx))
         
         # Info filter aktif
-        if len(filtered_details) < len(df_order_details):
-            st.info(f"📊 Menampilkan {len(filtered_details)} dari {len(df_order_details)} detail pesanan berdasarkan filter yang dipilih")
+        if detail_count < total_details:
+            st.info(f"📊 Menampilkan {metric_value(detail_count, approx)} dari {total_details} detail pesanan berdasarkan filter yang dipilih")
         
         st.markdown("---")
         
@@ -701,104 +951,117 @@ def visualisasiOrderDetails():
             col1, col2 = st.columns(2)
             
             with col1:
-                # Top 10 produk terlaris berdasarkan quantity (menggunakan data filtered)
-                top_products = filtered_details.groupby('product_name')['quantity'].sum().reset_index()
+                # Top 10 produk terlaris berdasarkan quantity
+                top_products = product_sales[['product_name', 'quantity']]
                 top_products = top_products.sort_values('quantity', ascending=False).head(10)
                 
                 fig_top = px.bar(
                     top_products,
                     x='product_name',
                     y='quantity',
-                    title='Top 10 Produk Terlaris (Berdasarkan Quantity)',
+                    title=f'Top 10 Produk Terlaris (Berdasarkan Quantity){approx}',
                     labels={'product_name': 'Nama Produk', 'quantity': 'Jumlah Terjual'},
                     color='quantity',
                     color_continuous_scale='Oranges'
                 )
                 fig_top.update_xaxes(tickangle=-45)
-                st.plotly_chart(fig_top, use_container_width=True)
+                plotly_chart(fig_top, "top")
             
             with col2:
-                # Top 10 produk berdasarkan revenue (menggunakan data filtered)
-                top_revenue = filtered_details.groupby('product_name')['subtotal'].sum().reset_index()
+                # Top 10 produk berdasarkan revenue
+                top_revenue = product_sales[['product_name', 'subtotal']]
                 top_revenue = top_revenue.sort_values('subtotal', ascending=False).head(10)
                 
                 fig_revenue = px.bar(
                     top_revenue,
                     x='product_name',
                     y='subtotal',
-                    title='Top 10 Produk Berdasarkan Revenue',
+                    title=f'Top 10 Produk Berdasarkan Revenue{approx}',
                     labels={'product_name': 'Nama Produk', 'subtotal': 'Revenue (Rp)'},
                     color='subtotal',
                     color_continuous_scale='Blues'
                 )
                 fig_revenue.update_xaxes(tickangle=-45)
-                st.plotly_chart(fig_revenue, use_container_width=True)
+                plotly_chart(fig_revenue, "revenue")
             
-            # Scatter plot quantity vs subtotal (menggunakan data filtered)
+            # Scatter plot quantity vs subtotal (menggunakan data filtered atau sampel quick look)
+            scatter_details, render_mode = prepare_scatter(details_by_product, 'quantity', 'subtotal', color='product_name')
             fig_scatter = px.scatter(
-                filtered_details,
+                scatter_details,
                 x='quantity',
                 y='subtotal',
-                size=np.array(filtered_details['subtotal'], dtype=float),
+                size=np.array(scatter_details['subtotal'], dtype=float),
                 color='product_name',
                 hover_name='product_name',
-                title='Hubungan Quantity vs Subtotal',
-                labels={'quantity': 'Quantity', 'subtotal': 'Subtotal (Rp)'}
+                title=f'Hubungan Quantity vs Subtotal{approx}',
+                labels={'quantity': 'Quantity', 'subtotal': 'Subtotal (Rp)'},
+                render_mode=render_mode
             )
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            plotly_chart(fig_scatter, "scatter")
         
         with tab2:
             st.markdown("### 📋 Tabel Data Detail Pesanan")
             
             showdata_details = st.multiselect(
                 "Pilih Kolom yang Ditampilkan",
-                options=filtered_details.columns,
+                options=list(FRAME_SCHEMAS['order_details']),
                 default=["order_id", "order_date", "customer_name", "product_name", "quantity", "subtotal"]
             )
-            st.dataframe(filtered_details[showdata_details], use_container_width=True)
+            st.dataframe(join_dimensions(filtered_details, showdata_details)[showdata_details], use_container_width=True)
             
             # Export CSV
-            @st.cache_data
-            def convert_df_to_csv(_df):
-                return _df.to_csv(index=False).encode('utf-8')
-            
-            csv = convert_df_to_csv(filtered_details[showdata_details])
-            st.download_button(
-                label="⬇️ Download Data Detail Pesanan sebagai CSV",
-                data=csv,
+            render_csv_export(
+                "order_details", showdata_details,
+                label="Data Detail Pesanan sebagai CSV",
                 file_name='data_detail_pesanan.csv',
-                mime='text/csv'
+                **detail_filters
             )
         
         with tab3:
-            # Pie chart distribusi penjualan produk (menggunakan data filtered)
-            product_sales = filtered_details.groupby('product_name')['quantity'].sum().reset_index()
-            fig_pie = px.pie(
-                product_sales,
-                values='quantity',
-                names='product_name',
-                title='Distribusi Penjualan Produk (Berdasarkan Quantity)',
-                hole=0.4
-            )
-            st.plotly_chart(fig_pie, use_container_width=True)
+            # Pie chart distribusi penjualan produk: top-N + "Lainnya" dari database
+            # (rollup jika filternya didukung, selain itu query dengan filter yang sama).
+            # Quick look: dari penjualan per produk sampel, tanpa query tambahan
+            if quick_look:
+                ranked = product_sales.sort_values(['quantity', 'product_name'], ascending=[False, True])
+                top, rest = ranked.head(PIE_TOP_N), ranked.iloc[PIE_TOP_N:]
+                sales_share = pd.DataFrame({
+                    'label': [*top['product_name'], *([OTHERS_LABEL] if len(rest) else [])],
+                    'value': [*top['quantity'], *([rest['quantity'].sum()] if len(rest) else [])],
+                })
+            else:
+                sales_share = loaded["sales_share"]
+            if sales_share is None and rollup_filters_only:
+                sales_share = view_top_n("order_details", **detail_filters)
+            if sales_share is None:
+                st.warning("⚠️ Distribusi penjualan produk tidak tersedia.")
+            else:
+                fig_pie = px.pie(
+                    sales_share,
+                    values='value',
+                    names='label',
+                    title=f'Distribusi Penjualan Produk (Top {PIE_TOP_N}, Berdasarkan Quantity){approx}',
+                    labels={'label': 'Nama Produk', 'value': 'Quantity'},
+                    hole=0.4
+                )
+                plotly_chart(fig_pie, "pie")
             
-            # Tabel produk terlaris (menggunakan data filtered)
+            # Tabel produk terlaris
             st.markdown("### 🏆 Ranking Produk Terlaris")
-            product_stats = filtered_details.groupby('product_name').agg({
-                'quantity': 'sum',
-                'subtotal': 'sum',
-                'order_id': 'count'
-            }).reset_index()
+            product_stats = product_sales[['product_name', 'quantity', 'subtotal', 'jumlah_pesanan']]
             product_stats.columns = ['Nama Produk', 'Total Terjual', 'Total Revenue (Rp)', 'Jumlah Pesanan']
             product_stats = product_stats.sort_values('Total Terjual', ascending=False)
             st.dataframe(product_stats, use_container_width=True)
         
         with tab4:
-            # Analisis penjualan per hari (menggunakan data filtered)
-            daily_sales = filtered_details.groupby(filtered_details['order_date'].dt.date).agg({
-                'quantity': 'sum',
-                'subtotal': 'sum'
-            }).reset_index()
+            # Analisis penjualan per hari (rollup jika filternya didukung, selain itu data filtered atau sampel quick look)
+            daily_sales = rollup_or_compute(
+                loaded.get("sales_by_day"),
+                lambda: filtered_details.groupby('day').agg(
+                    total_quantity=('quantity', 'sum'),
+                    total_revenue=('subtotal', 'sum')
+                ).reset_index(),
+                scale, totals=['total_quantity', 'total_revenue']
+            ).sort_values('day')
             daily_sales.columns = ['tanggal', 'total_quantity', 'total_revenue']
             
             col1, col2 = st.columns(2)
@@ -807,22 +1070,22 @@ def visualisasiOrderDetails():
                     daily_sales,
                     x='tanggal',
                     y='total_quantity',
-                    title='Trend Quantity Terjual per Hari',
+                    title=f'Trend Quantity Terjual per Hari{approx}',
                     labels={'tanggal': 'Tanggal', 'total_quantity': 'Total Quantity'},
                     markers=True
                 )
-                st.plotly_chart(fig_qty, use_container_width=True)
+                plotly_chart(fig_qty, "qty")
             
             with col2:
                 fig_rev = px.line(
                     daily_sales,
                     x='tanggal',
                     y='total_revenue',
-                    title='Trend Revenue per Hari',
+                    title=f'Trend Revenue per Hari{approx}',
                     labels={'tanggal': 'Tanggal', 'total_revenue': 'Total Revenue (Rp)'},
                     markers=True
                 )
-                st.plotly_chart(fig_rev, use_container_width=True)
+                plotly_chart(fig_rev, "rev")
     
     except Exception as e:
         st.error(f"❌ Gagal memuat data detail pesanan: {str(e)}")
@@ -930,6 +1193,56 @@ detail_pesanan = st.sidebar.checkbox(
     on_change=update_page_detail
 )
 
+# Quick look: baris dari sampel acak tabel, dibaca halaman Pesanan dan Detail Pesanan
+st.sidebar.markdown("---")
+st.sidebar.toggle(
+    f"⚡ Quick look (sampel {QUICK_LOOK_PERCENT:g}%)",
+    key="quick_look",
+    help="Halaman Pesanan dan Detail Pesanan memakai sampel acak (dari frame bersama, atau TABLESAMPLE pada "
+         "FILTER_MODE=sql): metrik dan grafik dihitung dari sampel sebagai perkiraan (≈), tanpa query agregat "
+         "tambahan. Export CSV tetap lengkap."
+)
+
+# Kontrol cache data: refresh manual dan statistik hit/miss
+st.sidebar.markdown("---")
+if st.sidebar.button("🔄 Refresh Data", help="Kosongkan cache agar data diambil ulang dari database"):
+    invalidate_cache()
+    st.sidebar.success("✅ Cache dikosongkan, data akan diambil ulang")
+
+with st.sidebar.expander("🗄️ Statistik Cache", expanded=False):
+    stats = cache_stats()
+    if stats:
+        stats_df = pd.DataFrame.from_dict(stats, orient='index')
+        stats_df['MB'] = stats_df.pop('bytes') / (1024 * 1024)
+        stats_df['MB frame bersama'] = stats_df.pop('pinned_bytes') / (1024 * 1024)
+        st.dataframe(
+            stats_df[['hits', 'misses', 'refreshes', 'evictions', 'entries', 'MB', 'MB frame bersama']],
+            use_container_width=True
+        )
+        st.caption(
+            f"Total {stats_df['MB'].sum():,.1f} MB" + (f" dari batas {CACHE_MAX_MB:g} MB" if CACHE_MAX_MB > 0 else "")
+            + f", ditambah frame bersama {stats_df['MB frame bersama'].sum():,.1f} MB (di luar batas)"
+        )
+    else:
+        st.caption("Belum ada data di cache")
+    # Frame dataset lengkap yang dipakai bersama oleh semua session (FILTER_MODE=shared)
+    store_stats = shared_frame_stats()
+    if store_stats:
+        st.markdown("**Frame Bersama**")
+        store_df = pd.DataFrame.from_dict(store_stats, orient='index')
+        store_df['MB'] = store_df.pop('bytes') / (1024 * 1024)
+        st.dataframe(store_df, use_container_width=True)
+
+# Status read replica (hanya tampil jika DB_REPLICA_DSNS diisi)
+replicas = replica_status()
+if replicas:
+    with st.sidebar.expander("🛰️ Read Replica", expanded=False):
+        replica_df = pd.DataFrame.from_dict(replicas, orient='index')
+        replica_df['healthy'] = replica_df['healthy'].map({True: '✅', False: '❌'})
+        st.dataframe(replica_df, use_container_width=True)
+        st.caption(f"Replica dengan lag > {REPLICA_MAX_LAG:g} detik dilewati; query baca pindah ke primary")
+st.sidebar.markdown("---")
+
 # Tentukan halaman aktif berdasarkan checkbox
 page = st.session_state.active_page
 
@@ -956,25 +1269,19 @@ if page == "🏠 Beranda":
     st.markdown("### 📊 Statistik Ringkas")
     col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.metric("👥 Total Pelanggan", df_customers.shape[0])
-    
-    result_products = view_products()
-    df_products = pd.DataFrame(result_products, columns=[
-        "product_id", "name", "description", "price", "stock"
-    ])
-    with col2:
-        st.metric("📦 Total Produk", df_products.shape[0])
-    
-    result_orders = view_orders_with_customers()
-    df_orders = pd.DataFrame(result_orders, columns=[
-        "order_id", "order_date", "total_amount", "customer_name", "phone"
-    ])
-    with col3:
-        st.metric("🛒 Total Pesanan", df_orders.shape[0])
-    
-    with col4:
-        st.metric("💰 Total Revenue", f"Rp {df_orders['total_amount'].sum():,.0f}")
+    summary = view_summary()
+    if summary is None:
+        st.warning("⚠️ Ringkasan data tidak tersedia. Periksa koneksi database.")
+    else:
+        total_customers, total_products, total_orders, total_revenue = summary
+        with col1:
+            st.metric("👥 Total Pelanggan", total_customers)
+        with col2:
+            st.metric("📦 Total Produk", total_products)
+        with col3:
+            st.metric("🛒 Total Pesanan", total_orders)
+        with col4:
+            st.metric("💰 Total Revenue", f"Rp {float(total_revenue):,.0f}")
 
 elif page == "👥 Pelanggan":
     st.title("👥 Data Pelanggan")
@@ -995,3 +1302,57 @@ elif page == "📋 Detail Pesanan":
     st.title("📋 Data Detail Pesanan")
     st.markdown("---")
     visualisasiOrderDetails()
+
+# Banner jika sebagian data dilayani dari snapshot di disk (cold start atau database tidak terhubung)
+snapshot_info = snapshot_status()
+if snapshot_info:
+    from snapshot import snapshot_age_text
+    snapshot_age = snapshot_age_text(snapshot_info['saved_at'])
+    if snapshot_info['offline']:
+        snapshot_banner.warning(
+            f"⚠️ Database tidak terhubung. Menampilkan snapshot terakhir ({snapshot_age}); data mungkin sudah tidak terbaru."
+        )
+    else:
+        snapshot_banner.info(f"🔄 Menampilkan snapshot ({snapshot_age}) sambil memuat data terbaru dari database.")
+
+# Waktu startup: durasi import dan total durasi script sampai halaman selesai dirender
+_script_elapsed = time.perf_counter() - _script_started
+print(f"⏱️ {page}: import {_imports_done - _script_started:.3f} detik, total {_script_elapsed:.3f} detik")
+st.sidebar.caption(f"⏱️ Halaman dirender dalam {_script_elapsed:.2f} detik")
+
+# Panel Performance: durasi, jumlah baris, dan ukuran setiap tahap pada rerun ini
+if perf.PERF_PANEL:
+    with st.sidebar.expander("⏱ Performance", expanded=False):
+        stages = perf.last_run()
+        if stages:
+            st.dataframe(
+                pd.DataFrame([{
+                    'Tahap': "\u2003" * stage.depth + stage.name,
+                    'Detik': stage.seconds,
+                    'Baris': stage.rows,
+                    'KB': None if stage.bytes is None else stage.bytes / 1024,
+                } for stage in stages]),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("Belum ada tahap yang tercatat")
+        # Prepared statement: planning time dihemat = jumlah generic plan (dari pg_prepared_statements) × planning time
+        prepared = prepared_statement_stats()
+        if prepared:
+            saved = [stats['saved_ms'] for stats in prepared.values() if stats['saved_ms'] is not None]
+            st.caption(
+                f"Prepared statement: {len(prepared)} query, planning time dihemat generic plan "
+                + (f"{sum(saved):.1f} ms" if saved else "belum terbaca (butuh PostgreSQL 14+)")
+            )
+            st.dataframe(
+                pd.DataFrame([{
+                    'Query': stats['label'],
+                    'Planning ms': stats['planning_ms'],
+                    'Eksekusi': stats['executions'],
+                    'Generic plan': stats['generic_plans'],
+                    'Hemat ms': stats['saved_ms'],
+                } for stats in prepared.values()]),
+                hide_index=True,
+                use_container_width=True
+            )
@@ -0,0 +1,278 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to path to import config
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import get_cursor
+
+# ============================
+# Materialized view untuk agregat dashboard
+# ============================
+# Interval refresh materialized view saat dijalankan dengan perintah "schedule" (detik)
+MATVIEW_REFRESH_INTERVAL = int(os.getenv("MATVIEW_REFRESH_INTERVAL", "900"))
+
+# Nama view -> (query agregat, kolom unik untuk REFRESH ... CONCURRENTLY)
+MATERIALIZED_VIEWS = {
+    # Pendapatan dan jumlah pesanan per bulan (halaman Pesanan, tab Grafik)
+    "mv_monthly_revenue": ('''
+        SELECT
+            to_char(o.order_date, 'YYYY-MM') AS month,
+            SUM(o.total_amount) AS total_amount,
+            COUNT(o.order_id) AS jumlah_pesanan
+        FROM orders o
+        JOIN customers c ON o.customer_id = c.customer_id
+        GROUP BY 1
+    ''', "month"),
+    # Pendapatan harian (halaman Pesanan, tab Trend Waktu)
+    "mv_daily_revenue": ('''
+        SELECT
+            o.order_date::date AS day,
+            SUM(o.total_amount) AS total_amount,
+            COUNT(o.order_id) AS jumlah_pesanan
+        FROM orders o
+        JOIN customers c ON o.customer_id = c.customer_id
+        GROUP BY 1
+    ''', "day"),
+    # Total pembelian per pelanggan (halaman Pesanan, tab Analisis Pelanggan)
+    "mv_customer_totals": ('''
+        SELECT
+            c.name AS customer_name,
+            COUNT(o.order_id) AS jumlah_pesanan,
+            SUM(o.total_amount) AS total_pembelian
+        FROM orders o
+        JOIN customers c ON o.customer_id = c.customer_id
+        GROUP BY c.name
+    ''', "customer_name"),
+    # Penjualan per produk (halaman Detail Pesanan, tab Grafik dan Produk Terlaris)
+    "mv_product_sales": ('''
+        SELECT
+            p.name AS product_name,
+            SUM(od.quantity) AS quantity,
+            SUM(od.subtotal) AS subtotal,
+            COUNT(o.order_id) AS jumlah_pesanan
+        FROM order_details od
+        JOIN orders o ON od.order_id = o.order_id
+        JOIN customers c ON o.customer_id = c.customer_id
+        JOIN products p ON od.product_id = p.product_id
+        GROUP BY p.name
+    ''', "product_name"),
+    # Quantity dan revenue harian (halaman Detail Pesanan, tab Analisis Penjualan)
+    "mv_daily_sales": ('''
+        SELECT
+            o.order_date::date AS day,
+            SUM(od.quantity) AS total_quantity,
+            SUM(od.subtotal) AS total_revenue
+        FROM order_details od
+        JOIN orders o ON od.order_id = o.order_id
+        JOIN customers c ON o.customer_id = c.customer_id
+        JOIN products p ON od.product_id = p.product_id
+        GROUP BY 1
+    ''', "day"),
+}
+
+# ============================
+# Index untuk filter dashboard
+# ============================
+# Nama index -> definisi tabel (kolom)
+INDEXES = {
+    # Filter usia pelanggan dan batas slider usia (MIN/MAX birthdate)
+    "customers_birthdate_idx": "customers (birthdate)",
+}
+
+def create_indexes():
+    """Buat index yang dipakai filter dashboard (aman dijalankan berulang)."""
+    with get_cursor(commit=True) as cur:
+        for name, definition in INDEXES.items():
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+            print(f"✅ Index {name} siap")
+
+# ============================
+# Tabel rollup penjualan harian per produk, diperbarui incremental dengan watermark
+# ============================
+# Interval pembaruan incremental rollup saat dijalankan dengan perintah "schedule" (detik)
+SALES_ROLLUP_INTERVAL = int(os.getenv("SALES_ROLLUP_INTERVAL", "60"))
+# Jumlah baris order_details paling banyak per transaksi pembaruan
+SALES_ROLLUP_BATCH_SIZE = int(os.getenv("SALES_ROLLUP_BATCH_SIZE", "100000"))
+
+SALES_ROLLUP_TABLE = "sales_daily_product"
+
+# Kolom mengikuti mv_product_sales / mv_daily_sales: jumlah_pesanan = jumlah baris detail pesanan
+ROLLUP_TABLES = {
+    SALES_ROLLUP_TABLE: '''
+        day date NOT NULL,
+        product_id integer NOT NULL,
+        quantity bigint NOT NULL DEFAULT 0,
+        subtotal numeric(18,2) NOT NULL DEFAULT 0,
+        jumlah_pesanan bigint NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    ''',
+    # Posisi terakhir (order_detail_id) yang sudah masuk ke setiap tabel rollup
+    "rollup_watermarks": '''
+        name text PRIMARY KEY,
+        last_id bigint NOT NULL DEFAULT 0
+    ''',
+}
+
+# Satu batch: ambil detail pesanan setelah watermark (urut id), agregasikan per (hari, produk)
+# lalu tambahkan ke baris rollup yang sudah ada. Join sama dengan materialized view agar angkanya sama.
+_SALES_ROLLUP_BATCH = f'''
+    WITH batch AS (
+        SELECT order_detail_id, order_id, product_id, quantity, subtotal
+        FROM order_details
+        WHERE order_detail_id > %(after_id)s
+        ORDER BY order_detail_id
+        LIMIT %(batch_size)s
+    ), totals AS (
+        SELECT
+            o.order_date::date AS day,
+            b.product_id,
+            COALESCE(SUM(b.quantity), 0) AS quantity,
+            COALESCE(SUM(b.subtotal), 0) AS subtotal,
+            COUNT(o.order_id) AS jumlah_pesanan
+        FROM batch b
+        JOIN orders o ON b.order_id = o.order_id
+        JOIN customers c ON o.customer_id = c.customer_id
+        JOIN products p ON b.product_id = p.product_id
+        GROUP BY 1, 2
+    ), upsert AS (
+        INSERT INTO {SALES_ROLLUP_TABLE} AS r (day, product_id, quantity, subtotal, jumlah_pesanan)
+        SELECT day, product_id, quantity, subtotal, jumlah_pesanan FROM totals
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            quantity = r.quantity + EXCLUDED.quantity,
+            subtotal = r.subtotal + EXCLUDED.subtotal,
+            jumlah_pesanan = r.jumlah_pesanan + EXCLUDED.jumlah_pesanan
+    )
+    SELECT COUNT(*), MAX(order_detail_id) FROM batch
+'''
+
+def create_rollup_tables():
+    """Buat tabel rollup dan watermark-nya (aman dijalankan berulang); isi awal lewat update_sales_rollup."""
+    with get_cursor(commit=True) as cur:
+        for name, columns in ROLLUP_TABLES.items():
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {name} ({columns})")
+            print(f"✅ Tabel {name} siap")
+        cur.execute(
+            "INSERT INTO rollup_watermarks (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+            (SALES_ROLLUP_TABLE,)
+        )
+
+def _apply_rollup_batches(cur, batch_size, max_batches=None):
+    """Jalankan batch di transaksi cursor sampai watermark menyusul (atau max_batches batch).
+
+    Mengembalikan jumlah detail pesanan yang diproses. Baris watermark dikunci (FOR UPDATE) sehingga dua proses pembaruan tidak menghitung baris yang sama.
+    """
+    cur.execute("SELECT last_id FROM rollup_watermarks WHERE name = %s FOR UPDATE", (SALES_ROLLUP_TABLE,))
+    row = cur.fetchone()
+    if row is None:
+        raise RuntimeError(f"Watermark {SALES_ROLLUP_TABLE} belum ada, jalankan perintah create dulu")
+    after_id, processed, batches = row[0], 0, 0
+    while max_batches is None or batches < max_batches:
+        cur.execute(_SALES_ROLLUP_BATCH, {"after_id": after_id, "batch_size": batch_size})
+        count, last_id = cur.fetchone()
+        if not count:
+            break
+        after_id, processed, batches = last_id, processed + count, batches + 1
+        cur.execute("UPDATE rollup_watermarks SET last_id = %s WHERE name = %s", (after_id, SALES_ROLLUP_TABLE))
+        if count < batch_size:
+            break
+    return processed
+
+def update_sales_rollup(batch_size=SALES_ROLLUP_BATCH_SIZE):
+    """Tambahkan detail pesanan baru (order_detail_id > watermark) ke rollup harian per produk.
+
+    Setiap batch di-commit bersama watermark-nya, sehingga proses yang terhenti bisa dilanjutkan.
+    Hanya baris baru yang dihitung: perubahan atau penghapusan detail pesanan lama, dan baris dari
+    transaksi yang commit setelah id yang lebih besar sudah diproses, baru masuk lewat rebuild_sales_rollup.
+    """
+    started = time.perf_counter()
+    total = 0
+    while True:
+        with get_cursor(commit=True) as cur:
+            processed = _apply_rollup_batches(cur, batch_size, max_batches=1)
+        total += processed
+        if processed < batch_size:
+            break
+    print(f"🔄 {SALES_ROLLUP_TABLE}: {total} detail pesanan baru diproses dalam {time.perf_counter() - started:.2f} detik")
+    return total
+
+def rebuild_sales_rollup(batch_size=SALES_ROLLUP_BATCH_SIZE):
+    """Hitung ulang seluruh rollup dari awal dalam satu transaksi (pembaca melihat isi lama sampai commit)."""
+    started = time.perf_counter()
+    with get_cursor(commit=True) as cur:
+        cur.execute("SELECT 1 FROM rollup_watermarks WHERE name = %s FOR UPDATE", (SALES_ROLLUP_TABLE,))
+        cur.execute(f"DELETE FROM {SALES_ROLLUP_TABLE}")
+        cur.execute("UPDATE rollup_watermarks SET last_id = 0 WHERE name = %s", (SALES_ROLLUP_TABLE,))
+        total = _apply_rollup_batches(cur, batch_size)
+    print(f"🔄 {SALES_ROLLUP_TABLE} dibangun ulang dari {total} detail pesanan dalam {time.perf_counter() - started:.2f} detik")
+    return total
+
+def create_materialized_views():
+    """Buat semua materialized view beserta unique index-nya (aman dijalankan berulang)."""
+    with get_cursor(commit=True) as cur:
+        for name, (query, unique_column) in MATERIALIZED_VIEWS.items():
+            cur.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}")
+            cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({unique_column})")
+            print(f"✅ Materialized view {name} siap")
+
+def refresh_materialized_views(concurrently=True):
+    """Refresh semua materialized view.
+
+    CONCURRENTLY membuat dashboard tetap bisa membaca view selama refresh berjalan.
+    Dashboard membaca hasil baru setelah cache "rollups" miliknya kedaluwarsa (CACHE_TTL_ROLLUPS).
+    """
+    mode = "CONCURRENTLY " if concurrently else ""
+    for name in MATERIALIZED_VIEWS:
+        started = time.perf_counter()
+        with get_cursor(commit=True) as cur:
+            cur.execute(f"REFRESH MATERIALIZED VIEW {mode}{name}")
+        print(f"🔄 {name} di-refresh dalam {time.perf_counter() - started:.2f} detik")
+
+def run_refresh_schedule(interval=MATVIEW_REFRESH_INTERVAL, rollup_interval=SALES_ROLLUP_INTERVAL):
+    """Perbarui rollup dan refresh materialized view secara berkala sampai dihentikan (Ctrl+C)."""
+    print(f"⏱️ Pembaruan {SALES_ROLLUP_TABLE} setiap {rollup_interval} detik, "
+          f"refresh materialized view setiap {interval} detik")
+    tasks = [
+        # [fungsi, interval, waktu jalan berikutnya]
+        [update_sales_rollup, rollup_interval, time.monotonic()],
+        [refresh_materialized_views, interval, time.monotonic()],
+    ]
+    while True:
+        for task in tasks:
+            func, task_interval, due = task
+            if time.monotonic() < due:
+                continue
+            try:
+                func()
+            except Exception as e:
+                print(f"❌ ERROR saat menjalankan {func.__name__}: {str(e)}")
+            task[2] = time.monotonic() + task_interval
+        time.sleep(max(0.0, min(task[2] for task in tasks) - time.monotonic()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pengelolaan objek database untuk dashboard sales")
+    parser.add_argument("command", choices=["create", "refresh", "rollup", "rebuild-rollup", "schedule"],
+                        help="create: buat index, tabel rollup, dan materialized view, refresh: refresh sekali, "
+                             "rollup: perbarui rollup incremental sekali, rebuild-rollup: hitung ulang rollup, "
+                             "schedule: pembaruan berkala")
+    parser.add_argument("--interval", type=int, default=MATVIEW_REFRESH_INTERVAL,
+                        help="Interval refresh materialized view dalam detik untuk perintah schedule")
+    parser.add_argument("--rollup-interval", type=int, default=SALES_ROLLUP_INTERVAL,
+                        help="Interval pembaruan rollup dalam detik untuk perintah schedule")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        create_indexes()
+        create_rollup_tables()
+        update_sales_rollup()
+        create_materialized_views()
+    elif args.command == "refresh":
+        refresh_materialized_views()
+    elif args.command == "rollup":
+        update_sales_rollup()
+    elif args.command == "rebuild-rollup":
+        rebuild_sales_rollup()
+    else:
+        run_refresh_schedule(args.interval, args.rollup_interval)
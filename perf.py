@@ -0,0 +1,110 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# ============================
+# Instrumentasi performa: durasi, jumlah baris, dan ukuran per tahap
+# ============================
+
+# Log terstruktur (satu objek JSON per tahap) ke stderr, bisa dimatikan dengan PERF_LOG=0
+PERF_LOG = os.getenv("PERF_LOG", "1") == "1"
+# Tampilkan expander "⏱ Performance" di sidebar dashboard
+PERF_PANEL = os.getenv("PERF_PANEL", "1") == "1"
+
+logger = logging.getLogger("dashboard.perf")
+if PERF_LOG and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Tahap-tahap milik rerun yang sedang berjalan. ContextVar membuat setiap session Streamlit
+# (yang dijalankan di thread-nya sendiri) mencatat tahapnya sendiri tanpa saling tercampur.
+_run_stages = contextvars.ContextVar("perf_run_stages", default=None)
+_depth = contextvars.ContextVar("perf_depth", default=0)
+
+def start_run():
+    """Mulai pencatatan untuk satu rerun script; tahap dari rerun sebelumnya dibuang."""
+    _run_stages.set([])
+    _depth.set(0)
+
+def last_run():
+    """Daftar tahap rerun saat ini (urut waktu mulai), atau list kosong jika tidak ada rerun aktif."""
+    return list(_run_stages.get() or [])
+
+def measure_result(result):
+    """Perkiraan (jumlah baris, bytes) dari hasil loader: DataFrame, list baris, atau satu baris."""
+    if result is None:
+        return 0, 0
+    if hasattr(result, "memory_usage"):
+        return len(result), int(result.memory_usage(index=True, deep=False).sum())
+    if isinstance(result, tuple):
+        return 1, sys.getsizeof(result) + sum(sys.getsizeof(v) for v in result)
+    if isinstance(result, list):
+        sample = result[0] if result else ()
+        row_bytes = sys.getsizeof(sample) + sum(sys.getsizeof(v) for v in sample)
+        return len(result), sys.getsizeof(result) + row_bytes * len(result)
+    return None, sys.getsizeof(result)
+
+class Stage:
+    """Satu tahap yang diukur; rows dan bytes diisi lewat record() di dalam blok stage()."""
+
+    def __init__(self, name, kind, depth):
+        self.name = name
+        self.kind = kind
+        self.depth = depth
+        self.seconds = None
+        self.rows = None
+        self.bytes = None
+        self.error = None
+
+    def record(self, result=None, rows=None, nbytes=None):
+        """Catat ukuran hasil tahap, dihitung dari result atau diberikan langsung."""
+        if result is not None:
+            rows, nbytes = measure_result(result)
+        self.rows, self.bytes = rows, nbytes
+        return result
+
+    def as_dict(self):
+        return {
+            "stage": self.name, "kind": self.kind, "depth": self.depth,
+            "seconds": None if self.seconds is None else round(self.seconds, 4),
+            "rows": self.rows, "bytes": self.bytes, "error": self.error,
+        }
+
+@contextmanager
+def stage(name, kind="stage"):
+    """Ukur durasi blok kode sebagai satu tahap; tahap bersarang dicatat dengan depth-nya."""
+    depth = _depth.get()
+    current = Stage(name, kind, depth)
+    stages = _run_stages.get()
+    if stages is not None:
+        stages.append(current)
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.seconds = time.perf_counter() - started
+        _depth.reset(token)
+        if PERF_LOG:
+            logger.info(json.dumps(current.as_dict()))
+
+def timed(kind):
+    """Decorator: ukur setiap panggilan fungsi sebagai tahap bernama sesuai fungsinya."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(func.__name__, kind) as current:
+                return current.record(func(*args, **kwargs))
+        return wrapper
+    return decorator
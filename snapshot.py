@@ -0,0 +1,107 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import pandas as pd
+
+# pyarrow opsional: tanpa pyarrow, DataFrame disimpan dengan pickle
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# ============================
+# Snapshot hasil loader di disk untuk cold start cepat dan mode offline
+# ============================
+
+class SnapshotStore:
+    """Simpan hasil loader per (dataset, key) sebagai file lokal.
+
+    DataFrame disimpan sebagai Feather (kolumnar, dibaca tanpa parsing per baris) jika pyarrow tersedia;
+    hasil lain (tuple/list baris) disimpan dengan pickle. File Feather dibuka dengan memory-map, tetapi
+    to_pandas() tetap menyalin isinya ke memori pandas: snapshot mempercepat cold start, bukan
+    menghemat RAM. Waktu modifikasi file menjadi timestamp kesegaran snapshot. File paling lama
+    dihapus jika jumlahnya melebihi max_files.
+    """
+
+    def __init__(self, directory, max_files=256):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, dataset, key, ext):
+        digest = hashlib.sha1(repr((dataset, key)).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.directory, f"{dataset}-{digest}{ext}")
+
+    def save(self, dataset, key, value):
+        """Tulis snapshot secara atomik (file sementara lalu os.replace)."""
+        is_frame = isinstance(value, pd.DataFrame)
+        ext = ".feather" if is_frame and feather is not None else ".pkl"
+        path = self._path(dataset, key, ext)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if is_frame and feather is not None:
+            feather.write_feather(value.reset_index(drop=True), tmp_path)
+        else:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def load(self, dataset, key):
+        """Kembalikan (value, saved_at) dari snapshot, atau None jika belum ada atau gagal dibaca."""
+        for ext in (".feather", ".pkl"):
+            path = self._path(dataset, key, ext)
+            if not os.path.exists(path):
+                continue
+            try:
+                saved_at = os.path.getmtime(path)
+                if ext == ".feather":
+                    if feather is None:
+                        continue
+                    value = feather.read_table(path, memory_map=True).to_pandas()
+                else:
+                    with open(path, "rb") as f:
+                        value = pickle.load(f)
+                return value, saved_at
+            except Exception as e:
+                print(f"⚠️ Snapshot {os.path.basename(path)} tidak bisa dibaca: {str(e)}")
+        return None
+
+    def clear(self):
+        """Hapus semua snapshot, mis. setelah isi database diganti."""
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith((".feather", ".pkl")):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def _prune(self):
+        with self._lock:
+            entries = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith((".feather", ".pkl"))
+            ]
+            if len(entries) <= self.max_files:
+                return
+            try:
+                entries.sort(key=os.path.getmtime)
+                for path in entries[:len(entries) - self.max_files]:
+                    os.remove(path)
+            except OSError:
+                pass  # File dihapus proses lain bersamaan; dicoba lagi pada penyimpanan berikutnya
+
+def snapshot_age_text(saved_at):
+    """Umur snapshot dalam teks singkat, mis. "5 menit lalu"."""
+    seconds = max(0, time.time() - saved_at)
+    if seconds < 60:
+        return f"{int(seconds)} detik lalu"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} menit lalu"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} jam lalu"
+    return f"{int(seconds // 86400)} hari lalu"